@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""
+Prebuilds the catalog snapshot read by `run_streamlit.py`, so the first session
+after a restart does not pay for parsing and license resolution.
+
+To run:
+
+python build_catalog.py [--snapshot cache/catalog_snapshot.pkl] [--num-workers 4] [--force] [--memory-report]
+"""
+
+import argparse
+import logging
+import os
+
+from src import catalog_util
+from src import constants
+from src.helpers import io
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--summary-dir", default=constants.DATA_SUMMARIES_DIR)
+    parser.add_argument("--snapshot", default=constants.CATALOG_SNAPSHOT_FP)
+    parser.add_argument("--num-workers", type=int, default=os.cpu_count() or 1,
+                        help="Parse collection files across this many processes.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is up to date.")
+    parser.add_argument("--memory-report", action="store_true", help="Print the in-memory size of each catalog column.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    all_constants = catalog_util.compile_constants(io.read_all_constants())
+    content_hash = catalog_util.hash_catalog_inputs(args.summary_dir)
+    catalog = None if args.force else catalog_util.read_snapshot(args.snapshot, content_hash)
+    if catalog is not None:
+        print(f"Snapshot {args.snapshot} is up to date ({content_hash[:12]}).")
+    else:
+        catalog = catalog_util.build_catalog(all_constants, args.summary_dir, content_hash, args.num_workers)
+        catalog_util.log_validation_report(catalog["validation"])
+        catalog_util.write_snapshot(catalog, args.snapshot)
+        print(f"Wrote {len(catalog['data'])} datasets to {args.snapshot} ({content_hash[:12]}).")
+
+    if args.memory_report:
+        report = catalog_util.memory_report(catalog["data"])
+        print(report.to_string(index=False))
+        print(f"Total: {report['Bytes'].sum() / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-let Plot;
+// The dataset fields this component reads (through prepareDataSummary), as paths into a row.
+// html_util.component_fields reads this line to build the component's payload.
+const componentFields = [["Creators"]];
+
 import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module => {
     Plot = module;
     // Your code that uses Plot here
@@ -52,7 +55,7 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
     mapPlot.setAttribute("id", "creator distribution worldmap")
 
 
-    document.querySelector('#container').append(mapPlot)
+    container.append(mapPlot)
 
     // Print the unmatched languages
     // console.log("Unmatched creators:", [...unmatchedCreators]);
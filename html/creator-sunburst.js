@@ -1,4 +1,3 @@
-let Plot;
 import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module => {
     Plot = module;
     // Your code that uses Plot here
@@ -256,7 +255,7 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
         return svg.node();
     }
 
-    const clean = prepareDataSummary(dataSummary)
+    // dataSummary is the creator hierarchy with counts, aggregated server-side (aggregate_util.creator_sunburst).
     // console.log(clean)
     // const nestedData = transformToNestedFormat(clean, 'licenseUseCategory', 'textTopics');
 
@@ -271,7 +270,7 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
     // let taskData = convertToSunburstFormat(clean, TASK_GROUPS, "tasks");
     // document.querySelector("#container").append(sunburst(taskData, "tasks sunburst"));
 
-    const creatorData = convertToSunburstFormat(clean, CREATOR_GROUPS, "creators");
-    document.querySelector("#container").append(sunburst(creatorData, "creator sunburst"));
+    const creatorData = dataSummary;
+    container.append(sunburst(creatorData, "creator sunburst"));
 
 });
\ No newline at end of file
@@ -0,0 +1,53 @@
+// dashboard.js
+// Lays out several components as panels of one page (see html_util.compose_dashboard), sharing the
+// libraries, assets and payload. Each panel renders when it first scrolls near the viewport.
+
+function renderDashboard(panels) {
+  const sections = panels.map(panel => {
+    const section = document.createElement("section");
+    section.setAttribute("class", "dashboard-panel");
+
+    if (panel.title) {
+      const title = document.createElement("h3");
+      title.textContent = panel.title;
+      section.append(title);
+    }
+    for (const text of panel.description) {
+      const paragraph = document.createElement("p");
+      paragraph.textContent = text;
+      section.append(paragraph);
+    }
+
+    const chart = document.createElement("div");
+    chart.setAttribute("class", "dashboard-chart");
+    chart.style.height = `${panel.height}px`;
+    section.append(chart);
+
+    for (const text of panel.notes) {
+      const paragraph = document.createElement("p");
+      paragraph.textContent = text;
+      section.append(paragraph);
+    }
+    container.append(section);
+    return { panel, chart, rendered: false };
+  });
+
+  const render = (entry) => {
+    if (entry.rendered) return;
+    entry.rendered = true;
+    entry.panel.render(entry.chart, entry.panel.data());
+  };
+
+  if (!("IntersectionObserver" in window)) {
+    sections.forEach(render);
+    return;
+  }
+  const observer = new IntersectionObserver((observed) => {
+    for (const { target, isIntersecting } of observed) {
+      if (!isIntersecting) continue;
+      observer.unobserve(target);
+      render(sections.find(entry => entry.chart === target));
+    }
+  }, { rootMargin: "400px 0px" });
+  sections.forEach(entry => observer.observe(entry.chart));
+}
@@ -16,6 +16,12 @@ async function readJsonData(filePath) {
   }
 }
 
+// Set by each component once it has imported Observable Plot.
+let Plot;
+
+// The element a component renders into: the page's #container, or its panel in a dashboard (see dashboard.js).
+const container = document.querySelector('#container');
+
 let licenseClassRemapper = {
   "commercial": "Commercial",
   "unspecified": "Unspecified",
@@ -28,7 +34,37 @@ function roundToOneDecimalPlace(number) {
   return Math.round(number * 10) / 10;
 }
 
+// Rebuilds row objects from the column-oriented payload sent by html_util.component_payload:
+// {"length": n, "columns": [[path, values], ...]}, where a path like ["Text Metrics", "Mean Inputs Length"]
+// names a nested field. Null values are left out, as if the row did not have the field.
+function rowsFromColumns(payload) {
+  const rows = Array.from({ length: payload.length }, () => ({}));
+  for (const [path, values] of payload.columns) {
+    const parents = path.slice(0, -1);
+    const key = path[path.length - 1];
+    values.forEach((value, i) => {
+      if (value === null) return;
+      let target = rows[i];
+      for (const parent of parents) {
+        target = target[parent] ?? (target[parent] = {});
+      }
+      target[key] = value;
+    });
+  }
+  return rows;
+}
+
+// Dashboard panels reading the same rows share one cleaned summary.
+const preparedSummaries = new WeakMap();
+
 function prepareDataSummary(data) {
+  if (!preparedSummaries.has(data)) {
+    preparedSummaries.set(data, cleanDataSummary(data));
+  }
+  return preparedSummaries.get(data);
+}
+
+function cleanDataSummary(data) {
   // CLEAN/FORMAT THE DATA
   const ddata = Object.values(data);
 
@@ -39,7 +75,7 @@ function prepareDataSummary(data) {
     if (!accumulatedLanguages[datasetName]) {
       accumulatedLanguages[datasetName] = [];
     }
-    accumulatedLanguages[datasetName].push(...dataset.Languages)
+    accumulatedLanguages[datasetName].push(...(dataset.Languages ?? []))
   });
 
   let clean = [];
@@ -60,18 +96,18 @@ function prepareDataSummary(data) {
     obj['datasetName'] = datasetName;
     obj['collection'] = dataset.Collection;
     obj['languages'] = accumulatedLanguages[datasetName];
-    obj['tasks'] = Array.from(dataset["Task Categories"]);
-    obj['textSources'] = Array.from(dataset["Text Sources"]);
+    obj['tasks'] = Array.from(dataset["Task Categories"] ?? []);
+    obj['textSources'] = Array.from(dataset["Text Sources"] ?? []);
     // obj['textDomains'] = Array.from(dataset["Text Domains"]);
-    obj['creators'] = Array.from(dataset["Creators"]);
+    obj['creators'] = Array.from(dataset["Creators"] ?? []);
 
     obj['licenseUseClass'] = dataset["License Use (DataProvenance)"];
     obj['licenseUseCategory'] = licenseClassRemapper[dataset["License Use (DataProvenance)"]] || dataset["License Use (DataProvenance)"];
-    obj['synthetic'] = Array.from(dataset["Model Generated"]).length > 0 ? "Synthetic" : "Regular";
-    obj['modelGenerated'] = Array.from(dataset["Model Generated"]);
+    obj['synthetic'] = Array.from(dataset["Model Generated"] ?? []).length > 0 ? "Synthetic" : "Regular";
+    obj['modelGenerated'] = Array.from(dataset["Model Generated"] ?? []);
 
     const models = ["OpenAI GPT-3", "OpenAI ChatGPT", "OpenAI GPT-4", "OpenAI Codex"];
-    if (Array.from(dataset["Model Generated"]).length > 0) {
+    if (Array.from(dataset["Model Generated"] ?? []).length > 0) {
       if (models.includes(dataset["Model Generated"][0])) {
         obj['syntheticClass'] = "Synthetic (" + dataset["Model Generated"][0] + ")";
       } else {
@@ -106,48 +142,6 @@ function prepareDataSummary(data) {
 }
 
 
-function convertToSunburstFormat(data, groups, field) {
-  let categoryGroups = {
-    name: `${field}_groups`,
-    children: []
-  };
-
-  // Create a dictionary to hold field counts
-  let fieldCounts = {};
-  for (let item of data) {
-    if (item[field]) {
-      for (let value of item[field]) {
-        if (value in fieldCounts) {
-          fieldCounts[value]++;
-        } else {
-          fieldCounts[value] = 1;
-        }
-      }
-    }
-  }
-
-  for (let [groupName, values] of Object.entries(groups)) {
-    let group = {
-      name: groupName,
-      children: []
-    };
-    for (let value of values) {
-      if (value in fieldCounts) {
-        group.children.push({
-          name: value,
-          value: fieldCounts[value]
-        });
-      }
-    }
-    if (group.children.length > 0) {
-      categoryGroups.children.push(group);
-    }
-  }
-
-  return categoryGroups;
-}
-
-
 function transformToNestedFormat(clean, parentField, childField) {
   // Expects `parentField` as strings, `childField` as lists
   let parentToChildMapping = {};
@@ -203,51 +197,6 @@ function transformToNestedFormat(clean, parentField, childField) {
 // console.log(nestedData);
 
 
-function setupLangWorldMap(countryCodes, langCodes, countryCodeToLangCodes) {
-
-  const langMap = {};
-  for (const code in langCodes) {
-    langMap[code] = langCodes[code].split(';').map(lang => lang.trim());
-  }
-
-  // Create the desired output mapping from country name to their languages and percentages
-  const countryToLanguageMapping = {};
-
-  for (let country of countryCodes) {
-    const { code, name } = country;
-
-    const languageDataForCountry = countryCodeToLangCodes[code];
-    if (!languageDataForCountry) continue;  // Skip countries without language data
-
-    countryToLanguageMapping[name] = {};
-
-    for (let langCode in languageDataForCountry) {
-      const { percent } = languageDataForCountry[langCode];
-      const languageNames = langMap[langCode];
-
-      if (languageNames) {
-        for (let langName of languageNames) {
-          countryToLanguageMapping[name][langName] = percent / 100.0;
-        }
-      }
-    }
-  }
-
-  // Step 1: Map language to countries present for easy lookup
-  const languageToCountryMapping = {};
-  for (let country in countryToLanguageMapping) {
-    for (let lang in countryToLanguageMapping[country]) {
-      if (lang in countryToLanguageMapping[country] > 0.1) {
-        if (!languageToCountryMapping[lang]) {
-          languageToCountryMapping[lang] = [];
-        }
-        languageToCountryMapping[lang].push(country);
-      }
-    }
-  }
-  return languageToCountryMapping;
-}
-
 function createWorldMap(counts, countries, countrymesh, title) {
   // Create a map with country names as keys and their respective values
   const countryValueMap = new Map(counts.map(d => [d.name, d.value]));
@@ -1,4 +1,3 @@
-let Plot;
 import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module => {
     Plot = module;
     // Your code that uses Plot here
@@ -284,7 +283,7 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
         return svg.node();
     }
 
-    const clean = prepareDataSummary(dataSummary)
+    // dataSummary is the task hierarchy with counts, aggregated server-side (aggregate_util.task_sunburst).
     // console.log(clean)
     // const nestedData = transformToNestedFormat(clean, 'licenseUseCategory', 'textTopics');
 
@@ -296,8 +295,8 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
     // document.querySelector("#container").append(sunburst(nestedData, "license sunburst"));
 
 
-    let taskData = convertToSunburstFormat(clean, TASK_GROUPS, "tasks");
-    document.querySelector("#container").append(sunburst(taskData, "tasks sunburst"));
+    let taskData = dataSummary;
+    container.append(sunburst(taskData, "tasks sunburst"));
 
     // const creatorData = convertToSunburstFormat(clean, CREATOR_GROUPS, "creators");
     // document.querySelector("#container").append(sunburst(creatorData, "creator sunburst"));
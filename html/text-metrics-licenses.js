@@ -1,4 +1,7 @@
-let Plot;
+// The dataset fields this component reads (through prepareDataSummary), as paths into a row.
+// html_util.component_fields reads this line to build the component's payload.
+const componentFields = [["Collection"], ["License Use (DataProvenance)"], ["Text Metrics", "Mean Inputs Length"], ["Text Metrics", "Mean Targets Length"]];
+
 import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module => {
   Plot = module;
 
@@ -83,7 +86,7 @@ import("https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm").then(module =
   let plotCount = document.getElementsByClassName("plotDiv").length + 1 //count the existing plotDivs
   let plotId = `plotDiv${plotCount}` //assign a new id by incrementing count
   plotDiv.setAttribute("id", plotId)
-  document.querySelector('#container').append(plotDiv) //append plotDiv to the parent container in index.html
+  container.append(plotDiv) //append plotDiv to the parent container in index.html
 
   //LAYERED DENSITY IN ONE PLOT
   let title = document.createElement("h1")
@@ -12,6 +12,8 @@ import pandas as pd
 # import math
 
 from src import util
+from src import aggregate_util
+from src import catalog_util
 from src import filter_util
 from src.helpers import io
 from src import constants
@@ -28,21 +30,8 @@ from PIL import Image
 import yaml
 
 
-INFO = {}
-
-
-@st.cache_data
-def load_constants():
-    return io.read_all_constants()
-
-
-@st.cache_data
-def load_data():
-    data_summary = io.read_data_summary_json("data_summaries/")
-    data_summary = filter_util.map_license_criteria(data_summary, INFO["constants"])
-    # st.write([r["Unique Dataset Identifier"] for r in data_summary if "License Attribution (DataProvenance)" not in r])
-    # st.write(data_summary[0].keys())
-    return pd.DataFrame(data_summary).fillna("")
+# Render each tab's charts as panels of one component (one iframe), rather than one component per chart.
+COMPOSITE_DASHBOARD = True
 
 
 # def render_tweet(tweet_url):
@@ -207,9 +196,13 @@ def add_instructions():
 
 def streamlit_app():
     st.set_page_config(page_title="Data Provenance Explorer", layout="wide")  # , initial_sidebar_state='collapsed')
-    INFO["constants"] = load_constants()
-    INFO["data"] = load_data()
-    df_metadata = util.compute_metrics(INFO["data"], INFO["constants"])
+    # One read-only catalog is shared by every session (see catalog_util.CatalogHandle);
+    # each rerun works on the version current when it started.
+    all_constants, catalog = catalog_util.CATALOG.get()
+    data = catalog["data"]
+    # Unfiltered aggregates, computed once per catalog version (see catalog_util.compute_baseline).
+    baseline = catalog["baseline"]
+    df_metadata = baseline["metrics"]
     add_instructions()
 
     # ### ALTERNATIVE STARTS HERE
@@ -238,19 +231,19 @@ def streamlit_app():
         with col3:
             taskcats_multiselect = st.multiselect(
                 'Select the task categories to cover in your datasets',
-                ["All"] + list(INFO["constants"]["TASK_GROUPS"].keys()),
+                ["All"] + list(all_constants["TASK_GROUPS"].keys()),
                 ["All"])
 
         # with st.expander("More advanced criteria"):
 
             # format_multiselect = st.multiselect(
             #     'Select the format types to cover in your datasets',
-            #     ["All"] + INFO["constants"]["FORMATS"],
+            #     ["All"] + all_constants["FORMATS"],
             #     ["All"])
 
             domain_multiselect = st.multiselect(
                 'Select the domain types to cover in your datasets',
-                ["All"] + list(INFO["constants"]["DOMAIN_GROUPS"].keys()),
+                ["All"] + list(all_constants["DOMAIN_GROUPS"].keys()),
                 # ["All", "Books", "Code", "Wiki", "News", "Biomedical", "Legal", "Web", "Math+Science"],
                 ["All"])
 
@@ -264,7 +257,7 @@ def streamlit_app():
         with col2:
             language_multiselect = st.multiselect(
                 'Select the languages to cover in your datasets',
-                ["All"] + list(INFO["constants"]["LANGUAGE_GROUPS"].keys()),
+                ["All"] + list(all_constants["LANGUAGE_GROUPS"].keys()),
                 ["All"])
 
             time_range_selection = st.slider(
@@ -284,9 +277,7 @@ def streamlit_app():
             start_time = None
         if end_time == "2023-12-01":
             end_time = None
-        filtered_df = filter_util.apply_filters(
-            df=INFO["data"],
-            all_constants=INFO["constants"],
+        filter_spec = filter_util.FilterSpec.from_selections(
             selected_collection=None,
             selected_licenses=None,  # Select all licenses.
             selected_license_sources=licensesource_multiselect,
@@ -301,15 +292,13 @@ def streamlit_app():
             selected_end_time=end_time,
             dpi_undefined_license_override=int(dpi_license_override),
             no_synthetic_data=model_generated,
-            text_source_allow_list=text_sources
+            text_source_allow_list=text_sources,
         )
-
-        def format_datetime(value):
-            if isinstance(value, pd.Timestamp):
-                return value.strftime('%Y-%m-%d')
-            return value
-        formatted_df = filtered_df.applymap(format_datetime)
-        filtered_data_summary = {row["Unique Dataset Identifier"]: row for row in formatted_df.to_dict(orient='records')}
+        # Equivalent submissions share one cached result, so repeats cost a lookup.
+        filtered_rows = filter_util.filter_catalog(catalog, all_constants, filter_spec)
+        filtered_df = data.iloc[filtered_rows]
+        # Each JS component is sent only the fields it reads, encoded once per filter result.
+        payload_key = (catalog["version"], filter_spec.cache_key())
 
         # save config file
         config_data = {
@@ -356,7 +345,7 @@ def streamlit_app():
             st.write("When you're ready, fill out your data filtering criteria on the left, and click Submit!\n\n")
 
         elif submitted:
-            metrics = util.compute_metrics(filtered_df, INFO["constants"])
+            metrics = util.compute_metrics(filtered_df, all_constants, catalog["facets"], filtered_rows)
 
             st.subheader('General Properties of your collection')
             st.write(r"""
@@ -371,7 +360,9 @@ def streamlit_app():
 
             with st.container():
                 st.header('Summary of Data Collections')
-                table = util.prep_collection_table(filtered_df, INFO["data"], metrics)
+                table = util.prep_collection_table(
+                    filtered_df, data, metrics, all_constants, catalog["facets"], filtered_rows,
+                    collection_datasets=baseline["collection_datasets"])
                 html_util.setup_table(table)
 
     with tab2:
@@ -383,6 +374,7 @@ def streamlit_app():
         st.write(tab2_intro)
 
         if submitted:
+            # The heading and formula stay outside the dashboard, where Streamlit can render the LaTeX.
             st.subheader("Language Representation by Country")
             st.write(r"""
             First we visualize the language coverage per country, according to the spoken languages and their representation in the Data Provenance Collection.
@@ -394,73 +386,78 @@ def streamlit_app():
             S_k = \sum_{l \in L} \left( p_{kl} \times \sum_{i \in D} w_{li} \right)
             ''')
 
-            html_util.compose_html_component(
-                filtered_data_summary,
-                "language-map.js", {
-                    "world": "html/countries-50m.json",
-                    "countryCodes": "html/country-codes.json",
-                    "langCodes": "html/language-codes.json",
-                    "countryCodeToLangCodes": "html/country-code-to-language-codes.json",
-                })
-            st.write("NB: While many global south countries have large English speaking populations, it may still not mean they are well represented by English text from Western/European origins.")
-
-            st.subheader("Dataset Creator Representation by Country")
-            st.write("Here we visualize the density of organizations that package/create these datasets for machine learning, in contrast to the above.")
-            st.write("This may help answer 'who owns the data?'")
-            html_util.compose_html_component(
-                filtered_data_summary,
-                "creator-map.js", {
-                    "world": "html/countries-50m.json",
-                    "countryToCreator": "html/constants/creator_groups_by_country.json",
-                })
-
-            st.subheader("Dataset Creator Proportions")
-            st.write("Here we count the contributions of organizations to dataset creation.")
-            html_util.compose_html_component(
-                filtered_data_summary,
-                "creator-sunburst.js", {
-                    "CREATOR_GROUPS": "html/constants/creator_groups.json",
-                }, 1600)
+            html_util.render_panels([
+                {
+                    "data_summary": aggregate_util.chart_aggregate(catalog, all_constants, "language-map.js", filtered_rows, filter_spec.cache_key()),
+                    "target_file": "language-map.js",
+                    "vars_to_files": {"world": "html/countries-50m.json"},
+                    "notes": ["NB: While many global south countries have large English speaking populations, it may still not mean they are well represented by English text from Western/European origins."],
+                },
+                {
+                    "title": "Dataset Creator Representation by Country",
+                    "description": [
+                        "Here we visualize the density of organizations that package/create these datasets for machine learning, in contrast to the above.",
+                        "This may help answer 'who owns the data?'",
+                    ],
+                    "data_summary": filtered_df,
+                    "target_file": "creator-map.js",
+                    "vars_to_files": {
+                        "world": "html/countries-50m.json",
+                        "countryToCreator": "html/constants/creator_groups_by_country.json",
+                    },
+                },
+                {
+                    "title": "Dataset Creator Proportions",
+                    "description": ["Here we count the contributions of organizations to dataset creation."],
+                    "data_summary": aggregate_util.chart_aggregate(catalog, all_constants, "creator-sunburst.js", filtered_rows, filter_spec.cache_key()),
+                    "target_file": "creator-sunburst.js",
+                    "height": 1600,
+                },
+            ], composite=COMPOSITE_DASHBOARD, cache_key=payload_key)
 
     with tab3:
         st.header("Text Characteristics :test_tube:")
         st.write("This section covers various characteristics of the text in the datasets.")
 
         if submitted:
-            st.subheader("Text Length Metrics x License Category")
-            st.write("Text-to-text datasets are formatted as an input-target pair.")
-            st.write("Here each point is a dataset, showing its input text length (in characters), target text length (in characters), and license category.")
-            html_util.compose_html_component(
-                filtered_data_summary, "text-metrics-licenses.js", {})
-
-            st.subheader("Text Length Metrics x Regular/Synthetic Text")
-            st.write("New text-to-text datasets are often synthetically generated by large models like GPT-4.")
-            st.write("""
-            Here each point is a dataset, showing its input text length (in characters), target text length (in characters), and whether it is synthetically generated,
-            or manually/human created.
-            """)
-            html_util.compose_html_component(
-                filtered_data_summary, "text-metrics-synthetic.js", {})
-
-            st.subheader("Task Category Distribution")
-            st.write("Here we measure the variety and distribution of tasks that the datasets represent -- i.e. what they're teaching a model to do.")
-            html_util.compose_html_component(
-                filtered_data_summary,
-                "tasks-sunburst.js", {
-                    "TASK_GROUPS": "html/constants/task_groups.json",
-                }, 1200)
-
-            # tree
-            st.subheader("Text Source Domains")
-            st.write("""
-            Many datasets are originally scraped from the web or other sources. For the data you've selected, we cluster the original sources by Domain,
-            quantify them and show the top sources 5 per domain.
-            """)
-            html_util.compose_html_component(
-                filtered_data_summary,
-                "source-tree.js", {
-                    "DOMAIN_GROUPS": "html/constants/domain_groups.json",
-                }, 2400)
+            html_util.render_panels([
+                {
+                    "title": "Text Length Metrics x License Category",
+                    "description": [
+                        "Text-to-text datasets are formatted as an input-target pair.",
+                        "Here each point is a dataset, showing its input text length (in characters), target text length (in characters), and license category.",
+                    ],
+                    "data_summary": filtered_df,
+                    "target_file": "text-metrics-licenses.js",
+                },
+                {
+                    "title": "Text Length Metrics x Regular/Synthetic Text",
+                    "description": [
+                        "New text-to-text datasets are often synthetically generated by large models like GPT-4.",
+                        "Here each point is a dataset, showing its input text length (in characters), target text length (in characters), and whether it is synthetically generated, "
+                        "or manually/human created.",
+                    ],
+                    "data_summary": filtered_df,
+                    "target_file": "text-metrics-synthetic.js",
+                },
+                {
+                    "title": "Task Category Distribution",
+                    "description": ["Here we measure the variety and distribution of tasks that the datasets represent -- i.e. what they're teaching a model to do."],
+                    "data_summary": aggregate_util.chart_aggregate(catalog, all_constants, "tasks-sunburst.js", filtered_rows, filter_spec.cache_key()),
+                    "target_file": "tasks-sunburst.js",
+                    "height": 1200,
+                },
+                {
+                    "title": "Text Source Domains",
+                    "description": [
+                        "Many datasets are originally scraped from the web or other sources. For the data you've selected, we cluster the original sources by Domain, "
+                        "quantify them and show the top sources 5 per domain.",
+                    ],
+                    "data_summary": aggregate_util.chart_aggregate(catalog, all_constants, "source-tree.js", filtered_rows, filter_spec.cache_key()),
+                    "target_file": "source-tree.js",
+                    "height": 2400,
+                },
+            ], composite=COMPOSITE_DASHBOARD, cache_key=payload_key)
 
     with tab4:
         st.header("Data Licenses :vertical_traffic_light:")
@@ -486,13 +483,16 @@ def streamlit_app():
         with st.form("data_explorer"):
             dataset_select = st.selectbox(
                 'Select the dataset in this collection to inspect',
-                list(set(INFO["data"]["Unique Dataset Identifier"])))
+                baseline["dataset_ids"])
 
             submitted2 = st.form_submit_button("Submit Selection")
 
         if submitted2:
-            tab2_selected_df = INFO["data"][INFO["data"]["Unique Dataset Identifier"] == dataset_select]
-            tab2_metrics = util.compute_metrics(tab2_selected_df, INFO["constants"])
+            tab2_selected_rows = baseline["dataset_rows"][dataset_select]
+            tab2_selected_df = data.iloc[list(tab2_selected_rows)]
+            # The descriptive fields (URLs, full Inferred Metadata, ...) are loaded on demand.
+            tab2_selected_df = catalog_util.hydrate(catalog, tab2_selected_df)
+            tab2_metrics = util.compute_metrics(tab2_selected_df, all_constants, catalog["facets"], tab2_selected_rows)
             display_metrics(tab2_metrics, df_metadata)
 
             with st.container():
@@ -529,7 +529,7 @@ def streamlit_app():
                         return np.mean([x for x in entries if x])
                     elif key == "Licenses":
                         return set([x["License"] for xs in entries for x in xs if x and x["License"]])
-                    elif isinstance(entries[0], list):
+                    elif isinstance(entries[0], (list, tuple)):
                         return list(set([x for xs in entries if xs for x in xs if x]))
                     else:
                         return list(set([x for x in entries if x]))
@@ -566,17 +566,18 @@ def streamlit_app():
 
                 st.subheader("Data Statistics")
                 # for info_key in data_characteristics_info_keys:
-                dset_info = extract_infos(tab2_selected_df, ("Text Metrics", "Num Dialogs"), numerical=True)
+                # Text Metrics are flattened into numeric columns when the catalog is built.
+                dset_info = extract_infos(tab2_selected_df, "Num Dialogs", numerical=True)
                 format_markdown_entry(round(dset_info, 0), "Num Exs")
                 dset_infos = [extract_infos(tab2_selected_df, info_key, numerical=True) for info_key in [
-                    ("Text Metrics", "Min Inputs Length"),
-                    ("Text Metrics", "Mean Inputs Length"),
-                    ("Text Metrics", "Max Inputs Length")]]
+                    "Min Inputs Length",
+                    "Mean Inputs Length",
+                    "Max Inputs Length"]]
                 format_markdown_entry("   |   ".join([str(round(x, 1)) for x in dset_infos]), "Input Length (characters) [Minimum | Mean | Maximum]")
                 dset_infos = [extract_infos(tab2_selected_df, info_key, numerical=True) for info_key in [
-                    ("Text Metrics", "Min Targets Length"),
-                    ("Text Metrics", "Mean Targets Length"),
-                    ("Text Metrics", "Max Targets Length")]]
+                    "Min Targets Length",
+                    "Mean Targets Length",
+                    "Max Targets Length"]]
                 format_markdown_entry("   |   ".join([str(round(x, 1)) for x in dset_infos]), "Target Length (characters) [Minimum | Mean | Maximum]")
 
                 st.subheader("Data Provenance")
@@ -604,25 +605,25 @@ def streamlit_app():
     #         # with data_select_cols[1]:
     #         language_multiselect = st.multiselect(
     #             'Select the languages to cover in your datasets',
-    #             ["All"] + list(INFO["constants"]["LANGUAGE_GROUPS"].keys()),
+    #             ["All"] + list(all_constants["LANGUAGE_GROUPS"].keys()),
     #             ["All"])
 
     #         # with data_select_cols[2]:
     #         taskcats_multiselect = st.multiselect(
     #             'Select the task categories to cover in your datasets',
-    #             ["All"] + list(INFO["constants"]["TASK_GROUPS"].keys()),
+    #             ["All"] + list(all_constants["TASK_GROUPS"].keys()),
     #             ["All"])
 
     #         with st.expander("More advanced criteria"):
 
     #             # format_multiselect = st.multiselect(
     #             #     'Select the format types to cover in your datasets',
-    #             #     ["All"] + INFO["constants"]["FORMATS"],
+    #             #     ["All"] + all_constants["FORMATS"],
     #             #     ["All"])
 
     #             domain_multiselect = st.multiselect(
     #                 'Select the domain types to cover in your datasets',
-    #                 ["All"] + list(INFO["constants"]["DOMAIN_GROUPS"].keys()),
+    #                 ["All"] + list(all_constants["DOMAIN_GROUPS"].keys()),
     #                 # ["All", "Books", "Code", "Wiki", "News", "Biomedical", "Legal", "Web", "Math+Science"],
     #                 ["All"])
 
@@ -0,0 +1,257 @@
+import os
+import typing
+
+import numpy as np
+import pandas as pd
+
+from src import cache_util
+from src import constants
+from src import index_util
+from src.helpers import io
+
+
+# Text source domains left out of the source tree; "Models" is replaced by the model-generated counts.
+SOURCE_TREE_EXCLUDED_DOMAINS = ["Unsure", "Others", "Models"]
+SOURCE_TREE_TOP_K = 5
+
+# Spoken languages below this share are left out of the language map's tooltips.
+LANGUAGE_TOOLTIP_MIN_SHARE = 0.05
+
+# Chart aggregates, keyed by (filter spec key, chart) within a catalog version.
+AGGREGATE_CACHE = cache_util.VersionedLRUCache(maxsize=64)
+
+
+#############################################################################
+############### Selection
+#############################################################################
+
+def first_per_dataset_name(catalog, rows: np.ndarray) -> np.ndarray:
+    """Boolean catalog mask of the first of `rows` for each Dataset Name.
+
+    The charts count each dataset once, and take the fields of its first variant (as
+    prepareDataSummary in helpers.js does).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    names = pd.Series(catalog["data"]["Dataset Name"].to_numpy()[rows])
+    selected = np.zeros(len(catalog["data"]), dtype=bool)
+    selected[rows[~names.duplicated().to_numpy()]] = True
+    return selected
+
+
+def _value_counts(facet, selected: np.ndarray):
+    # Occurrences of each facet value over the selected rows (duplicates included), and the
+    # position of each value's first occurrence, in row order.
+    codes = facet["codes"][selected[facet["rows"]]]
+    counts = np.bincount(codes, minlength=len(facet["vocab"]))
+    first_seen = np.full(len(facet["vocab"]), len(codes), dtype=np.int64)
+    values, first_idx = np.unique(codes, return_index=True)
+    first_seen[values] = first_idx
+    return counts, first_seen
+
+
+#############################################################################
+############### Charts
+#############################################################################
+
+def sunburst(facet, taxonomy_groups, selected: np.ndarray, name: str):
+    """Counts of each taxonomy member over the selected rows, nested by group.
+
+    Returns {"name", "children": [{"name": group, "children": [{"name": value, "value": count}]}]},
+    in taxonomy order. Members without occurrences and groups without members are left out.
+    """
+    counts, _ = _value_counts(facet, selected)
+    positions = facet["positions"]
+    children = []
+    for group, members in taxonomy_groups.items():
+        group_children = [
+            {"name": value, "value": int(counts[positions[value]])}
+            for value in members if value in positions and counts[positions[value]]
+        ]
+        if group_children:
+            children.append({"name": group, "children": group_children})
+    return {"name": name, "children": children}
+
+
+def task_sunburst(catalog, all_constants, selected: np.ndarray):
+    return sunburst(catalog["facets"]["Task Categories"], all_constants["TASK_GROUPS"], selected, "tasks_groups")
+
+
+def creator_sunburst(catalog, all_constants, selected: np.ndarray):
+    return sunburst(catalog["facets"]["Creators"], all_constants["CREATOR_GROUPS"], selected, "creators_groups")
+
+
+def _ranked_counts(facet, selected: np.ndarray, codes: typing.Iterable[int]):
+    # (value, count) for the given codes with occurrences, most frequent first, ties in order of first appearance.
+    counts, first_seen = _value_counts(facet, selected)
+    codes = [code for code in codes if counts[code]]
+    codes.sort(key=lambda code: (-counts[code], first_seen[code]))
+    return [(facet["vocab"][code], int(counts[code])) for code in codes], first_seen
+
+
+def source_tree(catalog, all_constants, selected: np.ndarray, top_k: int = SOURCE_TREE_TOP_K):
+    """The top `top_k` text sources per domain, plus a "Models" domain of the generating models.
+
+    Returns {"total": count, "domains": [{"name", "value", "children": [{"name", "value"}]}]}, with
+    domains ordered by count. Each domain keeps its `top_k` most frequent sources, and the rest are
+    summed into "Other". Sources in SOURCE_TREE_EXCLUDED_DOMAINS, or in no domain, are left out.
+    """
+    facet = catalog["facets"]["Text Sources"]
+    source_to_domain = index_util.get_taxonomy(all_constants, "DOMAIN_GROUPS")["group_of"]
+    ranked_sources, first_seen = _ranked_counts(facet, selected, range(len(facet["vocab"])))
+
+    domains = {}
+    for source, count in ranked_sources:
+        domain = source_to_domain.get(source)
+        if domain is not None and domain not in SOURCE_TREE_EXCLUDED_DOMAINS:
+            domains.setdefault(domain, []).append((source, count))
+    # Domains tied on count keep the order in which their first source appeared.
+    domain_first_seen = {
+        domain: min(first_seen[facet["positions"][source]] for source, _ in sources)
+        for domain, sources in domains.items()
+    }
+
+    models = catalog["facets"]["Model Generated"]
+    model_codes = [code for code, model in enumerate(models["vocab"]) if model and model.strip()]
+    ranked_models, _ = _ranked_counts(models, selected, model_codes)
+    if ranked_models:
+        domains["Models"] = ranked_models
+        domain_first_seen["Models"] = len(facet["codes"])
+
+    tree = []
+    for domain in sorted(domains, key=lambda d: (-sum(count for _, count in domains[d]), domain_first_seen[d])):
+        sources = domains[domain]
+        children = [{"name": name, "value": count} for name, count in sources[:top_k]]
+        if len(sources) > top_k:
+            children.append({"name": "Other", "value": sum(count for _, count in sources[top_k:])})
+        tree.append({"name": domain, "value": sum(count for _, count in sources), "children": children})
+    return {"total": sum(domain["value"] for domain in tree), "domains": tree}
+
+
+#############################################################################
+############### Language Map
+#############################################################################
+
+# {files key: matrix} of the last load_language_shares, replaced whole so concurrent sessions never
+# see it half-updated.
+_LANGUAGE_SHARES = {}
+
+
+def load_language_shares(
+    country_codes_fp: str = constants.COUNTRY_CODES_FP,
+    language_codes_fp: str = constants.LANGUAGE_CODES_FP,
+    country_languages_fp: str = constants.COUNTRY_LANGUAGES_FP,
+):
+    """The country x language speaker share matrix, read from the language map's JSON assets.
+
+    Every name of a language code (e.g. "Spanish; Castilian") gets that code's share. Reloaded only
+    when one of the files changes. Returns a dict:
+        countries / languages: the row and column names. Only countries with language data are rows.
+        country_idx / language_idx / shares: the nonzero entries, as coordinate arrays.
+        tooltips: {country: [[language, share], ...]}, the first name of each language spoken by at
+            least LANGUAGE_TOOLTIP_MIN_SHARE of the country.
+    """
+    global _LANGUAGE_SHARES
+    fps = (country_codes_fp, language_codes_fp, country_languages_fp)
+    key = tuple((fp, os.stat(fp).st_mtime_ns) for fp in fps)
+    matrix = _LANGUAGE_SHARES.get(key)
+    if matrix is not None:
+        return matrix
+
+    language_names = {
+        code: [name.strip() for name in names.split(";")]
+        for code, names in io.read_json(language_codes_fp).items()
+    }
+    country_languages = io.read_json(country_languages_fp)
+    country_shares, tooltips = {}, {}
+    for country in io.read_json(country_codes_fp):
+        spoken = country_languages.get(country["code"])
+        if spoken is None:
+            continue
+        # Countries listed under several codes keep the last one's languages.
+        shares = country_shares[country["name"]] = {}
+        tooltip = tooltips[country["name"]] = {}
+        for code, info in spoken.items():
+            for name in language_names.get(code, []):
+                shares[name] = info["percent"] / 100.0
+            if code in language_names:
+                tooltip[language_names[code][0]] = info["percent"] / 100.0
+
+    languages = {}
+    country_idx, language_idx, shares = [], [], []
+    for i, spoken in enumerate(country_shares.values()):
+        for name, share in spoken.items():
+            country_idx.append(i)
+            language_idx.append(languages.setdefault(name, len(languages)))
+            shares.append(share)
+
+    matrix = {
+        "countries": list(country_shares),
+        "languages": languages,
+        "country_idx": np.array(country_idx, dtype=np.int64),
+        "language_idx": np.array(language_idx, dtype=np.int64),
+        "shares": np.array(shares, dtype=np.float64),
+        "tooltips": {
+            country: [[name, share] for name, share in spoken.items() if share >= LANGUAGE_TOOLTIP_MIN_SHARE]
+            for country, spoken in tooltips.items()
+        },
+    }
+    _LANGUAGE_SHARES = {key: matrix}
+    return matrix
+
+
+def language_map(catalog, all_constants, selected: np.ndarray):
+    """Each country's score: the speaker share of each selected language, summed over its occurrences.
+
+    The score is the product of the country x language share matrix with the selected rows' language
+    counts, scaled so the top country is 1. Only countries speaking at least one of the selected
+    languages are scored. Returns {"scores": {country: score}, "tooltips": see load_language_shares}.
+    """
+    matrix = load_language_shares()
+    facet = catalog["facets"]["Languages"]
+    counts, _ = _value_counts(facet, selected)
+    language_counts = np.zeros(len(matrix["languages"]))
+    for code in np.flatnonzero(counts):
+        column = matrix["languages"].get(facet["vocab"][code])
+        if column is not None:
+            language_counts[column] += counts[code]
+
+    weights = language_counts[matrix["language_idx"]]
+    num_countries = len(matrix["countries"])
+    scores = np.bincount(matrix["country_idx"], weights=matrix["shares"] * weights, minlength=num_countries)
+    scored = np.bincount(matrix["country_idx"], weights=weights > 0, minlength=num_countries) > 0
+    if scored.any():
+        scores = scores / scores[scored].max()
+    return {
+        "scores": {matrix["countries"][i]: float(scores[i]) for i in np.flatnonzero(scored)},
+        "tooltips": matrix["tooltips"],
+    }
+
+
+# The aggregate each server-rendered chart receives as its dataSummary.
+CHART_AGGREGATES = {
+    "tasks-sunburst.js": task_sunburst,
+    "creator-sunburst.js": creator_sunburst,
+    "source-tree.js": source_tree,
+    "language-map.js": language_map,
+}
+
+# Charts counting every variant of a dataset, rather than only its first (the language map
+# accumulates the languages of all variants sharing a Dataset Name).
+ALL_VARIANT_CHARTS = {"language-map.js"}
+
+
+def chart_aggregate(catalog, all_constants, target_file: str, rows: np.ndarray, spec_key: str = None):
+    """The CHART_AGGREGATES entry of `target_file` over the filtered catalog `rows`, cached per filter spec."""
+    if spec_key is not None:
+        aggregate = AGGREGATE_CACHE.get(catalog["version"], (spec_key, target_file))
+        if aggregate is not None:
+            return aggregate
+    if target_file in ALL_VARIANT_CHARTS:
+        selected = np.zeros(len(catalog["data"]), dtype=bool)
+        selected[rows] = True
+    else:
+        selected = first_per_dataset_name(catalog, rows)
+    aggregate = CHART_AGGREGATES[target_file](catalog, all_constants, selected)
+    if spec_key is not None:
+        AGGREGATE_CACHE.put(catalog["version"], (spec_key, target_file), aggregate)
+    return aggregate
@@ -0,0 +1,43 @@
+import threading
+from collections import OrderedDict
+
+
+class VersionedLRUCache:
+    """Bounded, thread-safe LRU cache whose entries are keyed by catalog version.
+
+    Results computed for different catalog versions are kept apart rather than clearing the cache
+    when the version changes, so sessions still on the previous catalog after a reload keep their
+    entries until they age out.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            value = self._entries.get((version, key))
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end((version, key))
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            self._entries[(version, key)] = value
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
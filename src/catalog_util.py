@@ -0,0 +1,597 @@
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+import typing
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from src import cache_util
+from src import constants
+from src import filter_util
+from src import index_util
+from src import util
+from src.helpers import io
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout of the catalog (columns, dtypes, extra keys) changes,
+# so stale snapshots written by older code are rebuilt instead of loaded.
+SNAPSHOT_VERSION = 14
+
+# Text Metrics fields expanded into numeric columns at build; the dict is kept for display.
+TEXT_METRIC_DTYPES = {
+    "Num Dialogs": np.int64,
+    "Mean Inputs Length": np.float32,
+    "Min Inputs Length": np.float32,
+    "Max Inputs Length": np.float32,
+    "Mean Targets Length": np.float32,
+    "Min Targets Length": np.float32,
+    "Max Targets Length": np.float32,
+    "Mean Dialog Turns": np.float32,
+    "Min Dialog Turns": np.int64,
+    "Max Dialog Turns": np.int64,
+}
+
+
+#############################################################################
+############### Catalog Build
+#############################################################################
+
+def list_catalog_inputs(
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+) -> typing.Dict[str, typing.List[str]]:
+    """Returns every file the resolved catalog depends on: its collection files and constants files."""
+    return {
+        "summaries": io.list_collection_files(summary_dir),
+        "constants": sorted(glob.glob(os.path.join(constants_dir, "*.json"))),
+    }
+
+
+# {(path, mtime, size): sha256}, so unchanged input files are not re-read on every check.
+_FILE_HASHES = {}
+
+
+def hash_file(fp: str) -> str:
+    stat = os.stat(fp)
+    key = (fp, stat.st_mtime_ns, stat.st_size)
+    if key not in _FILE_HASHES:
+        with open(fp, "rb") as inf:
+            _FILE_HASHES[key] = hashlib.sha256(inf.read()).hexdigest()
+    return _FILE_HASHES[key]
+
+
+def hash_input_files(
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+) -> typing.Dict[str, typing.Dict[str, str]]:
+    """Content hash of each input file, as {"summaries": {path: sha256}, "constants": {path: sha256}}."""
+    return {
+        kind: {fp: hash_file(fp) for fp in fps}
+        for kind, fps in list_catalog_inputs(summary_dir, constants_dir).items()
+    }
+
+
+def combine_input_hashes(input_hashes) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(str(SNAPSHOT_VERSION).encode("utf-8"))
+    for kind in ["summaries", "constants"]:
+        for fp, file_hash in input_hashes[kind].items():
+            hasher.update(os.path.basename(fp).encode("utf-8"))
+            hasher.update(file_hash.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def hash_catalog_inputs(
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+) -> str:
+    """Content hash of the data summaries and constants, used to key the snapshot."""
+    return combine_input_hashes(hash_input_files(summary_dir, constants_dir))
+
+
+def compile_constants(all_constants):
+    """Adds the inverse indexes the hot paths use to the raw constants, once per process.
+
+    `TAXONOMIES` holds the compiled taxonomy (member -> group and group -> member bitmask, see
+    index_util.build_taxonomy) of each index_util.TAXONOMY_CONSTANTS entry, `LICENSE_TABLE` the
+    resolved license codes and `LICENSE_NAMES` the known license names.
+    """
+    compiled = dict(all_constants)
+    compiled["TAXONOMIES"] = {name: index_util.build_taxonomy(all_constants[name]) for name in index_util.TAXONOMY_CONSTANTS}
+    compiled["LICENSE_TABLE"] = filter_util.compile_license_table(all_constants)
+    compiled["LICENSE_NAMES"] = frozenset(all_constants["LICENSE_CLASSES"])
+    return compiled
+
+
+def build_catalog(
+    all_constants,
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    content_hash=None,
+    num_workers: int = 1,
+    constants_dir: str = constants.CONSTANTS_DIR,
+):
+    """Parses the data summaries and resolves their licenses into the catalog frame and its indexes."""
+    data_summary, summary_fps = io.read_data_summary_json(
+        summary_dir, num_workers=num_workers, use_processes=num_workers > 1, return_files=True)
+    df = compact_catalog_frame(build_catalog_frame(data_summary, all_constants))
+    input_hashes = hash_input_files(summary_dir, constants_dir)
+    catalog = {
+        "version": content_hash or combine_input_hashes(input_hashes),
+        "inputs": input_hashes,
+        "data": df,
+        "details": build_detail_locations(summary_fps),
+    }
+    return index_catalog(catalog, all_constants)
+
+
+def build_catalog_frame(data_summary, all_constants):
+    """Resolves the licenses of a list of dataset summaries and turns them into catalog rows."""
+    data_summary = filter_util.map_license_criteria(data_summary, all_constants)
+    df = filter_util.prepare_license_columns(pd.DataFrame(data_summary).fillna(""))
+    df = drop_detail_columns(df)
+    df["Estimated Creation Date"] = filter_util.estimate_creation_dates(df)
+    return add_text_metric_columns(df)
+
+
+def index_catalog(catalog, all_constants):
+    """Adds the facet, date and license indexes, and the validation report, for the catalog's frame."""
+    df = catalog["data"]
+    catalog["facets"] = index_util.build_facet_index(df, all_constants)
+    catalog["dates"] = index_util.build_date_index(df["Estimated Creation Date"])
+    catalog["license_cube"] = filter_util.build_license_cube(catalog, all_constants)
+    catalog["validation"] = validate_catalog(catalog, all_constants)
+    catalog["baseline"] = compute_baseline(catalog, all_constants)
+    return catalog
+
+
+def compute_baseline(catalog, all_constants):
+    """Aggregates over the whole catalog that the page compares every filtered result against.
+
+    `metrics` are the unfiltered `compute_metrics` (the "/ N" denominators), `collection_datasets`
+    the datasets per collection (for "% Datasets Used"), and `dataset_ids` / `dataset_rows` the
+    sorted dataset ids and each id's row positions, for the inspector.
+    """
+    df = catalog["data"]
+    dataset_rows = defaultdict(list)
+    for row, uid in enumerate(df["Unique Dataset Identifier"]):
+        dataset_rows[uid].append(row)
+    return {
+        "metrics": util.compute_metrics(df, all_constants, catalog["facets"], np.arange(len(df))),
+        "collection_datasets": df.groupby("Collection", observed=True)["Unique Dataset Identifier"].nunique().to_dict(),
+        "dataset_ids": sorted(dataset_rows),
+        "dataset_rows": dict(dataset_rows),
+    }
+
+
+def add_text_metric_columns(df):
+    """Expands each row's Text Metrics dict into the typed TEXT_METRIC_DTYPES columns (missing values are 0)."""
+    for field, dtype in TEXT_METRIC_DTYPES.items():
+        values = pd.to_numeric(pd.Series(
+            [metrics.get(field) if isinstance(metrics, dict) else None for metrics in df["Text Metrics"]],
+            index=df.index, dtype=object), errors="coerce")
+        df[field] = values.fillna(0).astype(dtype)
+    return df
+
+
+# String columns with at most this share of distinct values are stored as categoricals.
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+# List-valued columns whose rows are deduplicated into shared tuples of interned strings.
+SHARED_LIST_COLUMNS = [
+    "Languages", "Task Categories", "Format", "Text Sources", "Model Generated", "Creators",
+]
+
+
+def compact_catalog_frame(df):
+    """Shrinks the catalog's Python-object columns.
+
+    Repeated strings (Collection, URLs, Dataset Name, ...) become categoricals, and each
+    distinct list in SHARED_LIST_COLUMNS is stored once as a tuple of interned strings that
+    every row with that list points to. The license columns are already int8 codes, and the
+    list facets' codes live in the facet index.
+    """
+    for column in df.columns:
+        values = df[column]
+        if values.dtype != object and not pd.api.types.is_string_dtype(values.dtype):
+            continue
+        if column in SHARED_LIST_COLUMNS:
+            shared = {}
+            df[column] = pd.Series([
+                shared.setdefault(tuple(x), tuple(sys.intern(v) if isinstance(v, str) else v for v in x))
+                if isinstance(x, (list, tuple)) else x
+                for x in values
+            ], index=df.index, dtype=object)
+        elif all(isinstance(x, str) for x in values) and values.nunique() <= CATEGORICAL_MAX_UNIQUE_RATIO * len(values):
+            df[column] = values.astype("category")
+    return df
+
+
+def _deep_sizeof(value, seen) -> int:
+    # Size of a value and everything it references, counting shared objects once.
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_sizeof(v, seen) for v in value)
+    return size
+
+
+def memory_report(df) -> pd.DataFrame:
+    """Bytes held by each column of the catalog frame, largest first.
+
+    Object columns are measured deeply (nested lists and dicts included), counting objects
+    shared between rows once.
+    """
+    report = []
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            seen = set()
+            num_bytes = values.memory_usage(index=False) + sum(_deep_sizeof(x, seen) for x in values)
+        else:
+            num_bytes = values.memory_usage(index=False, deep=True)
+        report.append({"Column": column, "Dtype": str(values.dtype), "Bytes": int(num_bytes)})
+    return pd.DataFrame(report).sort_values("Bytes", ascending=False, ignore_index=True)
+
+
+def freeze(value):
+    """Returns a read-only view of a catalog or constants structure, for sharing across sessions.
+
+    Dicts become MappingProxyTypes, lists become tuples and NumPy arrays are marked
+    non-writeable (in place). DataFrames are returned as is: callers must treat them as
+    read-only and select rows by position rather than modifying them.
+    """
+    if isinstance(value, (dict, types.MappingProxyType)):
+        return types.MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    return value
+
+
+#############################################################################
+############### Incremental Reload
+#############################################################################
+
+def update_catalog(
+    catalog,
+    all_constants,
+    changed_fps: typing.List[str],
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+):
+    """Returns a new catalog with the rows of `changed_fps` re-read from disk.
+
+    Only the changed collection files are parsed and have their licenses resolved; rows from
+    the other files are reused as is. Files that no longer exist are dropped. The indexes are
+    rebuilt from the patched frame, and the version changes so version-keyed caches are invalidated.
+    `catalog` itself is not modified.
+    """
+    df = catalog["data"]
+    old_files = list(catalog["details"]["files"])
+    file_of = catalog["details"]["file_of"]
+    changed_fps = set(changed_fps)
+
+    changed_summaries, changed_summary_fps = [], []
+    for fp in sorted(fp for fp in changed_fps if os.path.exists(fp)):
+        summaries, _, _ = io.read_collection_json(fp)
+        changed_summaries.extend(summaries)
+        changed_summary_fps.extend([fp] * len(summaries))
+    changed_df = build_catalog_frame(changed_summaries, all_constants) if changed_summaries else None
+    changed_summary_fps = np.array(changed_summary_fps, dtype=object)
+
+    # Keep rows in sorted file order, as a full build would.
+    file_rank = {fp: rank for rank, fp in enumerate(io.list_collection_files(summary_dir))}
+    old_ranks = np.array([file_rank.get(fp, -1) if fp not in changed_fps else -1 for fp in old_files])[file_of]
+    kept_rows = np.flatnonzero(old_ranks >= 0)
+    ranks = np.concatenate([old_ranks[kept_rows], [file_rank[fp] for fp in changed_summary_fps]]).astype(np.int64)
+    parts = [df.iloc[kept_rows]] + ([changed_df] if changed_df is not None else [])
+    order = np.argsort(ranks, kind="stable")
+    new_df = pd.concat(parts, ignore_index=True).iloc[order].reset_index(drop=True)
+    summary_fps = np.concatenate([np.array(old_files, dtype=object)[file_of[kept_rows]], changed_summary_fps])[order]
+    for column in new_df.columns:
+        # Fields absent from some collection files are "", as in a full build.
+        values = new_df[column]
+        if (values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype)) and values.isna().any():
+            new_df[column] = values.astype(object).fillna("")
+    input_hashes = hash_input_files(summary_dir, constants_dir)
+    new_catalog = {
+        "version": combine_input_hashes(input_hashes),
+        "inputs": input_hashes,
+        "data": compact_catalog_frame(new_df),
+        "details": build_detail_locations(summary_fps),
+    }
+    return index_catalog(new_catalog, all_constants)
+
+
+# Catalog versions already warned about changed constants, so the warning is logged once.
+_STALE_CONSTANTS_WARNED = set()
+
+
+def reload_catalog(
+    catalog,
+    all_constants,
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+):
+    """Returns the catalog updated for any input files changed since it was built.
+
+    Returns `catalog` itself if nothing changed. Changed, added or removed collection files
+    are patched in with `update_catalog`. Changed constants are not picked up: they affect
+    every row and the loaded `all_constants`, so they need a restart (or a fresh `load_catalog`).
+    """
+    input_hashes = hash_input_files(summary_dir, constants_dir)
+    old_hashes = catalog["inputs"]
+    if input_hashes["constants"] != dict(old_hashes["constants"]):
+        if catalog["version"] not in _STALE_CONSTANTS_WARNED:
+            _STALE_CONSTANTS_WARNED.add(catalog["version"])
+            logger.warning(f"Constants in {constants_dir} changed; restart to rebuild the catalog with them")
+        return catalog
+
+    changed_fps = sorted(
+        fp for fp in set(input_hashes["summaries"]) | set(old_hashes["summaries"])
+        if input_hashes["summaries"].get(fp) != old_hashes["summaries"].get(fp)
+    )
+    if not changed_fps:
+        return catalog
+    start = time.perf_counter()
+    new_catalog = update_catalog(catalog, all_constants, changed_fps, summary_dir, constants_dir)
+    logger.info(
+        f"Reloaded {len(changed_fps)} collection files in {(time.perf_counter() - start) * 1000:.0f} ms: "
+        f"{', '.join(os.path.basename(fp) for fp in changed_fps)} ({new_catalog['version'][:12]})"
+    )
+    return new_catalog
+
+
+#############################################################################
+############### Dataset Details
+#############################################################################
+
+# Descriptive fields kept out of the catalog frame, and read from the collection files on demand.
+DETAIL_FIELDS = [
+    "Inferred Metadata", "Dataset Filter IDs", "Derived from Datasets", "License Notes",
+    "Dataset URL", "GitHub URL", "Papers with Code URL", "ArXiv URL",
+]
+# The Inferred Metadata fields the catalog frame keeps, for the facets, dates and JS payloads.
+SLIM_METADATA_FIELDS = [
+    "Text Topics", "S2 Citation Count (June 2023)", "HF Downloads (June 2023)", "PwC Date",
+] + filter_util.CREATION_DATE_FIELDS
+
+# Detail fields of recently inspected datasets, keyed by Unique Dataset Identifier.
+DETAILS_CACHE = cache_util.VersionedLRUCache(maxsize=256)
+
+
+def drop_detail_columns(df):
+    """Removes the DETAIL_FIELDS from the frame, keeping only the SLIM_METADATA_FIELDS of Inferred Metadata."""
+    df = df.drop(columns=[field for field in DETAIL_FIELDS if field in df.columns and field != "Inferred Metadata"])
+    if "Inferred Metadata" in df.columns:
+        df["Inferred Metadata"] = [
+            {k: metadata[k] for k in SLIM_METADATA_FIELDS if k in metadata} if isinstance(metadata, dict) else metadata
+            for metadata in df["Inferred Metadata"]
+        ]
+    return df
+
+
+def build_detail_locations(summary_fps: typing.List[str]):
+    """Records the collection file each catalog row was read from, so its details can be reloaded."""
+    files, file_of = np.unique(np.array(summary_fps, dtype=object).astype(str), return_inverse=True)
+    return {"files": list(files), "file_of": file_of.astype(np.int32)}
+
+
+def load_details(catalog, rows: np.ndarray) -> pd.DataFrame:
+    """Returns the DETAIL_FIELDS of the given catalog rows, indexed by row position.
+
+    Each collection file holding an uncached dataset is read once; fields a dataset does
+    not have are "" (as in the catalog frame).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    uids = catalog["data"]["Unique Dataset Identifier"].to_numpy()[rows]
+    details = {uid: DETAILS_CACHE.get(catalog["version"], uid) for uid in uids}
+    missing = [row for row, uid in zip(rows, uids) if details[uid] is None]
+    files = catalog["details"]["files"]
+    for file_idx in np.unique(catalog["details"]["file_of"][missing]):
+        summaries, _, _ = io.read_collection_json(files[file_idx])
+        by_uid = {summary["Unique Dataset Identifier"]: summary for summary in summaries}
+        for uid in uids:
+            if details[uid] is None and uid in by_uid:
+                details[uid] = {field: by_uid[uid].get(field, "") for field in DETAIL_FIELDS}
+                DETAILS_CACHE.put(catalog["version"], uid, details[uid])
+    return pd.DataFrame(
+        [details[uid] or {field: "" for field in DETAIL_FIELDS} for uid in uids],
+        index=rows, columns=DETAIL_FIELDS)
+
+
+def hydrate(catalog, df):
+    """Returns a copy of a (filtered) catalog frame with its rows' DETAIL_FIELDS loaded."""
+    details = load_details(catalog, df.index.to_numpy())
+    return df.drop(columns=[field for field in DETAIL_FIELDS if field in df.columns]).join(details)
+
+
+#############################################################################
+############### Catalog Validation
+#############################################################################
+
+def validate_catalog(catalog, all_constants):
+    """Checks the catalog against the taxonomies and license columns, once per build.
+
+    Returns a report of every problem found, instead of failing on the first one:
+    `missing_taxonomy` maps each list column to the values absent from its taxonomy, and
+    `license_columns` lists license code columns that are missing or out of range.
+    """
+    df = catalog["data"]
+    missing_taxonomy = {}
+    for column, taxonomy in index_util.FACET_TAXONOMIES.items():
+        known = set(index_util.get_taxonomy(all_constants, taxonomy)["positions"])
+        seen = set(v for vs in df[column] for v in vs)
+        if column == "Model Generated":
+            # Model names are matched case-insensitively.
+            known = set(v.lower() for v in known)
+            missing = sorted(v for v in seen if v.lower() not in known)
+        else:
+            missing = sorted(seen - known)
+        if missing:
+            missing_taxonomy[column] = missing
+
+    license_columns = []
+    num_use_codes = len(constants.LICENSE_USE_TYPES)
+    for source in filter_util.LICENSE_SOURCES:
+        for field, max_code in [("Use", num_use_codes - 1), ("Attribution", 1), ("Share Alike", 1)]:
+            column = f"License {field} ({source})"
+            if column not in df.columns:
+                license_columns.append(f"{column}: missing")
+                continue
+            codes = df[column].to_numpy()
+            if len(codes) and (codes.min() < filter_util.MISSING_LICENSE_CODE or codes.max() > max_code):
+                license_columns.append(f"{column}: codes outside [{filter_util.MISSING_LICENSE_CODE}, {max_code}]")
+
+    return {"missing_taxonomy": missing_taxonomy, "license_columns": license_columns}
+
+
+def log_validation_report(report):
+    for column, missing in report["missing_taxonomy"].items():
+        logger.warning(f"{len(missing)} {column} missing from the taxonomy constants: {missing}")
+    for problem in report["license_columns"]:
+        logger.warning(f"Invalid license column {problem}")
+
+
+#############################################################################
+############### Catalog Snapshot
+#############################################################################
+
+def write_snapshot(catalog, outpath: str = constants.CATALOG_SNAPSHOT_FP):
+    dirname = os.path.dirname(outpath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    payload = {"snapshot_version": SNAPSHOT_VERSION, "catalog": catalog}
+    # Write to a temporary file first so concurrent readers never see a partial snapshot.
+    tmp_path = f"{outpath}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as outf:
+        pickle.dump(payload, outf, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, outpath)
+
+
+def read_snapshot(inpath: str = constants.CATALOG_SNAPSHOT_FP, content_hash=None):
+    """Returns the snapshotted catalog, or None if it is missing, unreadable or stale."""
+    if not os.path.exists(inpath):
+        return None
+    try:
+        with open(inpath, "rb") as inf:
+            payload = pickle.load(inf)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable catalog snapshot {inpath}: {e}")
+        return None
+    if payload.get("snapshot_version") != SNAPSHOT_VERSION:
+        return None
+    catalog = payload["catalog"]
+    if content_hash is not None and catalog["version"] != content_hash:
+        return None
+    return catalog
+
+
+def load_catalog(
+    all_constants,
+    summary_dir: str = constants.DATA_SUMMARIES_DIR,
+    constants_dir: str = constants.CONSTANTS_DIR,
+    snapshot_fp: str = constants.CATALOG_SNAPSHOT_FP,
+):
+    """Opens the catalog snapshot, rebuilding it only if its inputs have changed."""
+    content_hash = hash_catalog_inputs(summary_dir, constants_dir)
+    catalog = read_snapshot(snapshot_fp, content_hash)
+    if catalog is None:
+        logger.info(f"Rebuilding catalog snapshot {snapshot_fp} ({content_hash[:12]})")
+        catalog = build_catalog(all_constants, summary_dir, content_hash, constants_dir=constants_dir)
+        try:
+            write_snapshot(catalog, snapshot_fp)
+        except OSError as e:
+            logger.warning(f"Could not write catalog snapshot {snapshot_fp}: {e}")
+    log_validation_report(catalog["validation"])
+    return catalog
+
+
+#############################################################################
+############### Shared Catalog
+#############################################################################
+
+class CatalogHandle:
+    """Thread-safe holder of the constants and catalog that every session shares.
+
+    The first caller loads them behind a lock while concurrent callers wait for that one
+    load, rather than each building their own copy. Later calls check for edited collection
+    files at most every `check_interval` seconds, and reload them on one thread while the
+    others keep serving the current catalog.
+    """
+
+    def __init__(
+        self,
+        summary_dir: str = constants.DATA_SUMMARIES_DIR,
+        constants_dir: str = constants.CONSTANTS_DIR,
+        snapshot_fp: str = constants.CATALOG_SNAPSHOT_FP,
+        check_interval: float = 5.0,
+    ):
+        self.summary_dir = summary_dir
+        self.constants_dir = constants_dir
+        self.snapshot_fp = snapshot_fp
+        self.check_interval = check_interval
+        # (constants, catalog), both frozen. Replaced as a whole, so readers never see a mix.
+        self._state = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the current (constants, catalog) pair, loading it on first use."""
+        state = self._state
+        if state is None:
+            with self._lock:
+                if self._state is None:
+                    self._state = self._load()
+                    self._last_check = time.monotonic()
+                return self._state
+        if time.monotonic() - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._state = self._reload(self._state)
+            finally:
+                # Advanced on failure too, so a broken file is retried once per interval, not on every rerun.
+                self._last_check = time.monotonic()
+                self._lock.release()
+        return self._state
+
+    def _load(self):
+        start = time.perf_counter()
+        all_constants = compile_constants(io.read_all_constants())
+        catalog = load_catalog(all_constants, self.summary_dir, self.constants_dir, self.snapshot_fp)
+        logger.info(f"Loaded catalog {catalog['version'][:12]} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return freeze(all_constants), freeze(catalog)
+
+    def _reload(self, state):
+        all_constants, catalog = state
+        try:
+            new_catalog = reload_catalog(catalog, all_constants, self.summary_dir, self.constants_dir)
+        except Exception:
+            # E.g. an edited file is malformed, or names a license missing from the constants:
+            # keep serving the last good catalog.
+            logger.exception("Could not reload the catalog; serving the last good one")
+            return state
+        if new_catalog is catalog:
+            return state
+        try:
+            write_snapshot(new_catalog, self.snapshot_fp)
+        except OSError as e:
+            logger.warning(f"Could not write catalog snapshot {self.snapshot_fp}: {e}")
+        return all_constants, freeze(new_catalog)
+
+
+# The catalog shared by every Streamlit session in this process.
+CATALOG = CatalogHandle()
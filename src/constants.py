@@ -10,6 +10,13 @@ CREATOR_CONSTANTS_FP = "html/constants/creator_groups.json"
 CREATOR_COUNTRY_CONSTANTS_FP = "html/constants/creator_groups_by_country.json"
 FORMATS_CONSTANTS_FP = "html/constants/data_formats.json"
 DOMAINS_CONSTANTS_FP = "html/constants/domain_groups.json"
+COUNTRY_CODES_FP = "html/country-codes.json"
+LANGUAGE_CODES_FP = "html/language-codes.json"
+COUNTRY_LANGUAGES_FP = "html/country-code-to-language-codes.json"
 
 LICENSE_USE_TYPES = ['Commercial', 'Unspecified', 'Non-Commercial', 'Academic-Only']
-LICENSE_USE_CLASSES = ['Commercial', 'Unspecified', 'Non-Commercial', 'Academic-Only']
\ No newline at end of file
+LICENSE_USE_CLASSES = ['Commercial', 'Unspecified', 'Non-Commercial', 'Academic-Only']
+
+DATA_SUMMARIES_DIR = "data_summaries/"
+CONSTANTS_DIR = "html/constants/"
+CATALOG_SNAPSHOT_FP = "cache/catalog_snapshot.pkl"
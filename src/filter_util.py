@@ -1,47 +1,78 @@
 # import os
-# import numpy as np
+import dataclasses
+import hashlib
+import itertools
+import json
+import typing
+import numpy as np
 import pandas as pd
 from collections import defaultdict  # , Counter
 # import streamlit as st
+from src import cache_util
 from src import constants
+from src import index_util
 # from src.helpers import io
 
 
-def classify_license(license_name, license_url, all_constants):
-    if license_name == "Custom":
-        use_case, attribution, share_alike = all_constants["CUSTOM_LICENSE_CLASSES"].get(license_url, ("?", "?", "?"))
-    else:
-        print(all_constants["LICENSE_CLASSES"][license_name])
-        use_case, attribution, share_alike = all_constants["LICENSE_CLASSES"][license_name]
-    return {
-        "use": use_case,
-        "attribution": int(attribution) if attribution.isnumeric() else 1,
-        "share_alike": int(share_alike) if share_alike.isnumeric() else 1,
+# License use classes in LICENSE_CLASSES/CUSTOM_LICENSE_CLASSES, as ordinals into
+# constants.LICENSE_USE_TYPES (least to most restrictive). Unknown ("?") is treated
+# as academic-only, so resolving several licenses is just a max over each field.
+LICENSE_USE_CODES = {"All": 0, "Unspecified": 1, "NC": 2, "Acad": 3, "?": 3}
+LICENSE_USE_NAMES = [x.lower() for x in constants.LICENSE_USE_TYPES]  # ["commercial", ...]
+UNKNOWN_LICENSE_CODES = (LICENSE_USE_CODES["?"], 1, 1)
+# Code stored for use, attribution and share alike when an aggregator has no license.
+MISSING_LICENSE_CODE = -1
+
+LICENSE_SOURCES = ["DataProvenance", "DataProvenance IgnoreOpenAI", "HuggingFace", "GitHub", "PapersWithCode"]
+# Sources that can fall back to the GitHub license when their own is unspecified.
+GITHUB_FALLBACK_SOURCES = ["DataProvenance", "DataProvenance IgnoreOpenAI"]
+
+
+def _encode_license_class(license_class):
+    use_case, attribution, share_alike = license_class
+    return (
+        LICENSE_USE_CODES[use_case],
+        int(attribution) if attribution.isnumeric() else 1,
+        int(share_alike) if share_alike.isnumeric() else 1,
+    )
+
+
+def compile_license_table(all_constants):
+    """Resolves every known (license_name, license_url) pair to (use, attribution, share_alike) codes.
+
+    Named licenses are keyed with a None url; custom licenses are keyed by ("Custom", url).
+    """
+    license_table = {
+        (license_name, None): _encode_license_class(license_class)
+        for license_name, license_class in all_constants["LICENSE_CLASSES"].items()
     }
+    for license_url, license_class in all_constants["CUSTOM_LICENSE_CLASSES"].items():
+        license_table[("Custom", license_url)] = _encode_license_class(license_class)
+    return license_table
+
+
+def classify_license(license_name, license_url, license_table):
+    if license_name == "Custom":
+        return license_table.get(("Custom", license_url), UNKNOWN_LICENSE_CODES)
+    return license_table[(license_name, None)]
 
 
-def resolve_multiple_licenses(license_criterias):
-    if not license_criterias:
-        # Return empty if no licenses from this aggregator
-        return ["", "", ""]
-    use_cases = [license_criteria["use"] for license_criteria in license_criterias]
-    attributions = [license_criteria["attribution"] for license_criteria in license_criterias]
-    share_alikes = [license_criteria["share_alike"] for license_criteria in license_criterias]
+def resolve_multiple_licenses(license_codes):
+    if not license_codes:
+        # Return missing codes if no licenses from this aggregator
+        return MISSING_LICENSE_CODE, MISSING_LICENSE_CODE, MISSING_LICENSE_CODE
+    return tuple(max(codes) for codes in zip(*license_codes))
 
-    if "?" in use_cases:
-        resolved_use_case = "academic-only"
-    elif "Acad" in use_cases:
-        resolved_use_case = "academic-only"
-    elif "NC" in use_cases:
-        resolved_use_case = "non-commercial"
-    elif "Unspecified" in use_cases:
-        resolved_use_case = "unspecified"
-    elif "All":
-        resolved_use_case = "commercial"
 
-    resolved_attribution = max(attributions)
-    resolved_share_alikes = max(share_alikes)
-    return resolved_use_case, resolved_attribution, resolved_share_alikes
+def find_unknown_licenses(uid_to_license_infos, license_table):
+    """Returns {license_name: [uids]} for licenses that have no entry in the license table."""
+    unknown_licenses = defaultdict(list)
+    for uid, license_infos in uid_to_license_infos.items():
+        for (license_name, _) in license_infos:
+            if license_name != "Custom" and (license_name, None) not in license_table:
+                if uid not in unknown_licenses[license_name][-1:]:
+                    unknown_licenses[license_name].append(uid)
+    return dict(unknown_licenses)
 
 
 def map_license_criteria(data_summary, all_constants):
@@ -79,26 +110,46 @@ def map_license_criteria(data_summary, all_constants):
         if pwc_license:
             pwc_uid_to_license_infos[uid].append((pwc_license, None))
 
-    # valid_licenses = list(all_constants["LICENSE_CLASSES"].keys())
-    # print(set([v for vs in pwc_uid_to_license_infos.values() for (v, _) in vs]) - set(valid_licenses))
-    # print(set([v for vs in github_uid_to_license_infos.values() for (v, _) in vs]) - set(valid_licenses))
+    license_table = all_constants.get("LICENSE_TABLE") or compile_license_table(all_constants)
+
+    # Report every unknown license up front, rather than failing on the first one mid-run.
+    unknown_licenses = {}
+    for aggregator, uid_to_license_infos in [
+        ("DataProvenance", our_uid_to_license_infos),
+        ("HuggingFace", hf_uid_to_license_infos),
+        ("GitHub", github_uid_to_license_infos),
+        ("PapersWithCode", pwc_uid_to_license_infos),
+    ]:
+        for license_name, uids in find_unknown_licenses(uid_to_license_infos, license_table).items():
+            unknown_licenses[f"{license_name} ({aggregator})"] = uids
+    if unknown_licenses:
+        report = "\n".join(
+            f"  {license_name}: {len(uids)} datasets, e.g. {', '.join(uids[:3])}"
+            for license_name, uids in sorted(unknown_licenses.items())
+        )
+        raise ValueError(f"Licenses missing from {constants.LICENSE_CONSTANTS_FP}:\n{report}")
+
+    # Many datasets share the same license list, so memoize the resolution per list.
+    resolved_cache = {}
 
-    def classify_and_resolve_licenses(license_infos, all_constants):
-        classified_licenses = []
-        for (license_name, license_url) in license_infos:
-            classifications = classify_license(license_name, license_url, all_constants)
-            classified_licenses.append(classifications)
-        resolved_criteria = resolve_multiple_licenses(classified_licenses)
-        return resolved_criteria
+    def classify_and_resolve_licenses(license_infos):
+        key = tuple(license_infos)
+        if key not in resolved_cache:
+            license_codes = [
+                classify_license(license_name, license_url, license_table)
+                for (license_name, license_url) in license_infos
+            ]
+            resolved_cache[key] = resolve_multiple_licenses(license_codes)
+        return resolved_cache[key]
 
     # classify and resolve licenses for each dataset and each aggregator
     ours_resolved, ours_openai_resolved, hf_resolved, gh_resolved, pwc_resolved = {}, {}, {}, {}, {}
     for uid in our_uid_to_license_infos.keys():
-        ours_resolved[uid] = classify_and_resolve_licenses(our_uid_to_license_infos[uid], all_constants)
-        ours_openai_resolved[uid] = classify_and_resolve_licenses(our_uid_to_license_infos_no_openai[uid], all_constants)
-        hf_resolved[uid] = classify_and_resolve_licenses(hf_uid_to_license_infos[uid], all_constants)
-        gh_resolved[uid] = classify_and_resolve_licenses(github_uid_to_license_infos[uid], all_constants)
-        pwc_resolved[uid] = classify_and_resolve_licenses(pwc_uid_to_license_infos[uid], all_constants)
+        ours_resolved[uid] = classify_and_resolve_licenses(our_uid_to_license_infos[uid])
+        ours_openai_resolved[uid] = classify_and_resolve_licenses(our_uid_to_license_infos_no_openai[uid])
+        hf_resolved[uid] = classify_and_resolve_licenses(hf_uid_to_license_infos[uid])
+        gh_resolved[uid] = classify_and_resolve_licenses(github_uid_to_license_infos[uid])
+        pwc_resolved[uid] = classify_and_resolve_licenses(pwc_uid_to_license_infos[uid])
 
     def add_license_classes_to_summaries(data_summary, resolved_classes, aggregator):
         # update dataframe with columns for use, attribution, share_alike
@@ -118,6 +169,57 @@ def map_license_criteria(data_summary, all_constants):
     return data_summary
 
 
+CREATION_DATE_FIELDS = ["S2 Date", "HF Date", "GitHub Date"]
+
+
+def estimate_creation_dates(df):
+    """Earliest of the S2, HF and GitHub dates in each row's Inferred Metadata (NaT if there are none)."""
+    field_dates = [
+        pd.to_datetime(
+            pd.Series([
+                (metadata.get(field) or None) if isinstance(metadata, dict) else None
+                for metadata in df["Inferred Metadata"]
+            ], index=df.index, dtype=object),
+            format='%Y-%m-%d', errors='coerce')
+        for field in CREATION_DATE_FIELDS
+    ]
+    return pd.concat(field_dates, axis=1).min(axis=1)
+
+
+def license_use_column(source, github_fallback=False):
+    if github_fallback and source in GITHUB_FALLBACK_SOURCES:
+        return f"License Use ({source} GitHubFallback)"
+    return f"License Use ({source})"
+
+
+def prepare_license_columns(df):
+    """Stores the license code columns as int8 and precomputes the GitHub fallback use columns.
+
+    `License Use (<source> GitHubFallback)` takes the GitHub license use wherever the
+    source's own is unspecified and a GitHub license exists.
+    """
+    for source in LICENSE_SOURCES:
+        for field in ["Use", "Attribution", "Share Alike"]:
+            df[f"License {field} ({source})"] = df[f"License {field} ({source})"].astype(np.int8)
+    github_use = df["License Use (GitHub)"].to_numpy()
+    for source in GITHUB_FALLBACK_SOURCES:
+        source_use = df[license_use_column(source)].to_numpy()
+        use_github = (source_use == LICENSE_USE_CODES["Unspecified"]) & (github_use != MISSING_LICENSE_CODE)
+        df[license_use_column(source, github_fallback=True)] = np.where(use_github, github_use, source_use).astype(np.int8)
+    return df
+
+
+def decode_license_columns(df):
+    """Returns a copy of `df` with license codes mapped back to their display values ("" if missing)."""
+    df = df.copy()
+    for column in df.columns:
+        if column.startswith("License Use ("):
+            df[column] = [LICENSE_USE_NAMES[code] if code != MISSING_LICENSE_CODE else "" for code in df[column]]
+        elif column.startswith("License Attribution (") or column.startswith("License Share Alike ("):
+            df[column] = [int(code) if code != MISSING_LICENSE_CODE else "" for code in df[column]]
+    return df
+
+
 def apply_filters(
     df,
     all_constants,
@@ -136,183 +238,292 @@ def apply_filters(
     selected_start_time,
     selected_end_time,
     dpi_undefined_license_override,  # flag to use GitHub license information if not available ("undefined") for our Data Provenance source
+    facet_index=None,  # bitset facets over `df` (see index_util.build_facet_index), built on the fly if not given
+    date_index=None,  # sorted creation dates of `df` (see index_util.build_date_index), built on the fly if not given
+    license_cube=None,  # precomputed license stage bitmaps of `df` (see build_license_cube), if available
+    catalog_version=None,  # if given, each predicate's mask is cached in MASK_CACHE under this catalog version
 ):
-    filtered_df = df
-    # st.write(filtered_df.columns)
-
-    # Some sanity checks:
-    all_langs = set([v for vs in all_constants["LANGUAGE_GROUPS"].values() for v in vs])
-    option_langs = set(
-        [lang for langs in filtered_df["Languages"].tolist() for lang in langs]
-    )
-    assert all_langs >= option_langs, f"Missing Languages: {option_langs - all_langs}"
-    all_tcats = set([v for vs in all_constants["TASK_GROUPS"].values() for v in vs])
-    option_tcats = set(
-        [tc for tcs in filtered_df["Task Categories"].tolist() for tc in tcs]
-    )
-    assert (
-        all_tcats >= option_tcats
-    ), f"Missing Task Categories: {option_tcats - all_tcats}"
-    all_sources = set([v for vs in all_constants["DOMAIN_GROUPS"].values() for v in vs])
-    option_sources = set(
-        [src for sources in filtered_df["Text Sources"].tolist() for src in sources]
+    """Returns the rows of `df` selected by the form arguments.
+
+    Kept for callers holding a frame rather than a catalog: this builds a FilterSpec and evaluates it
+    with compute_filter_mask, as `filter_catalog` does.
+    """
+    # Taxonomy coverage and license columns are checked once per catalog, see catalog_util.validate_catalog.
+    spec = FilterSpec.from_selections(
+        selected_collection=selected_collection,
+        selected_licenses=selected_licenses,
+        selected_license_sources=selected_license_sources,
+        selected_license_use=selected_license_use,
+        openai_license_override=openai_license_override,
+        selected_license_attribution=selected_license_attribution,
+        selected_license_sharealike=selected_license_sharealike,
+        selected_languages=selected_languages,
+        selected_task_categories=selected_task_categories,
+        selected_domains=selected_domains,
+        no_synthetic_data=no_synthetic_data,
+        text_source_allow_list=text_source_allow_list,
+        selected_start_time=selected_start_time,
+        selected_end_time=selected_end_time,
+        dpi_undefined_license_override=dpi_undefined_license_override,
     )
-    assert all_sources >= option_sources, f"Missing Text Sources: {option_sources - all_sources}"
+    catalog = {
+        "version": catalog_version,
+        "data": df,
+        "facets": facet_index if facet_index is not None else index_util.build_facet_index(df, all_constants),
+        "dates": date_index,
+        "license_cube": license_cube,
+    }
+    mask_cache = MASK_CACHE if catalog_version is not None else None
+    return df[compute_filter_mask(catalog, all_constants, spec, mask_cache)]
+
+
+#############################################################################
+############### Filter Specs & Result Cache
+#############################################################################
+
+def _normalize_multiselect(selections):
+    # "All" (or nothing) means no restriction, which we store as an empty tuple.
+    if not selections or "All" in selections:
+        return ()
+    return tuple(sorted(set(selections)))
+
+
+@dataclasses.dataclass(frozen=True)
+class FilterSpec:
+    """A normalized, hashable form of the data selection form.
+
+    Multiselects are sorted and deduplicated, with "All" stored as an empty tuple, and the
+    OpenAI override is folded into `license_sources`, so equivalent form submissions
+    produce equal specs.
+    """
+    collection: typing.Optional[str] = None
+    known_licenses_only: bool = False
+    license_sources: typing.Tuple[str, ...] = ()
+    license_use: typing.Optional[str] = None
+    license_attribution: typing.Optional[int] = None
+    license_sharealike: typing.Optional[int] = None
+    github_fallback: bool = False
+    languages: typing.Tuple[str, ...] = ()
+    task_categories: typing.Tuple[str, ...] = ()
+    domains: typing.Tuple[str, ...] = ()
+    no_synthetic_data: bool = False
+    text_sources: typing.Tuple[str, ...] = ()
+    start_time: typing.Optional[str] = None
+    end_time: typing.Optional[str] = None
+
+    @classmethod
+    def from_selections(
+        cls,
+        selected_collection=None,
+        selected_licenses=None,
+        selected_license_sources=(),
+        selected_license_use=None,
+        openai_license_override=False,
+        selected_license_attribution=None,
+        selected_license_sharealike=None,
+        selected_languages=(),
+        selected_task_categories=(),
+        selected_domains=(),
+        no_synthetic_data=False,
+        text_source_allow_list=(),
+        selected_start_time=None,
+        selected_end_time=None,
+        dpi_undefined_license_override=False,
+    ):
+        """Builds a spec from the same arguments as `apply_filters`, without mutating any of them."""
+        license_sources = set(selected_license_sources or [])
+        if selected_license_use and openai_license_override and "DataProvenance" in license_sources:
+            license_sources.discard("DataProvenance")
+            license_sources.add("DataProvenance IgnoreOpenAI")
+        return cls(
+            collection=selected_collection or None,
+            known_licenses_only=bool(selected_licenses),
+            license_sources=tuple(sorted(license_sources)),
+            license_use=selected_license_use or None,
+            license_attribution=None if selected_license_attribution in (None, "") else int(selected_license_attribution),
+            license_sharealike=None if selected_license_sharealike in (None, "") else int(selected_license_sharealike),
+            github_fallback=bool(dpi_undefined_license_override),
+            languages=_normalize_multiselect(selected_languages),
+            task_categories=_normalize_multiselect(selected_task_categories),
+            domains=_normalize_multiselect(selected_domains),
+            no_synthetic_data=bool(no_synthetic_data),
+            text_sources=_normalize_multiselect(text_source_allow_list),
+            start_time=selected_start_time or None,
+            end_time=selected_end_time or None,
+        )
 
-    all_models = set([v.lower() for vs in all_constants["MODEL_GROUPS"].values() for v in vs])
-    option_models = set(
-        [model.lower() for models in filtered_df["Model Generated"].tolist() for model in models]
-    )
-    assert len(all_models) >= len(option_models), f"Missing Models: {option_models - all_models}"
-
-    if selected_collection:
-        filtered_df = filtered_df[filtered_df["Collection"] == selected_collection]
-
-    if not filtered_df.empty and selected_licenses:
-        license_strs = set(all_constants["LICENSE_CLASSES"].keys())
-        filtered_df = filtered_df[
-            filtered_df["Licenses"].apply(lambda xs: license_strs >= set([x["License"] for x in xs]))
-        ]
-
-    if not filtered_df.empty and selected_license_use:
-        valid_license_use_idx = constants.LICENSE_USE_TYPES.index(selected_license_use)
-        valid_license_uses = [x.lower() for x in constants.LICENSE_USE_TYPES[:valid_license_use_idx + 1]]  # ["academic-only", ...]
-
-        # check if openai license override is selected, if so, remove DataProvenance from sources and add DataProvenance IgnoreOpenAI
-        if openai_license_override:
-            # remove "DataProvenance" from selected_license_sources if openai_license_override is selected and add "DataProvenance IgnoreOpenAI" to selected_license_sources
-            if "DataProvenance" in selected_license_sources:
-                selected_license_sources.remove("DataProvenance")
-                selected_license_sources.append("DataProvenance IgnoreOpenAI")
-
-            # Check that DataProvenance is not in selected_license_sources if openai_license_override is selected
-            assert "DataProvenance" not in selected_license_sources, f"DataProvenance should not be in selected_license_sources: {selected_license_sources}"
-
-        # we have a flag to indicate if we want to use the GitHub license information if the DataProvenance or DataProvenance license is unspecified
-        if dpi_undefined_license_override:
-            # Check if "DataProvenance" is included in the selected license sources
-            # If so, apply the GitHub license information (if it is not empty) to the DataProvenance license information
-            if "DataProvenance" in selected_license_sources:
-                filtered_df["License Use (DataProvenance)"] = filtered_df.apply(
-                    lambda row: row["License Use (GitHub)"]  # check the existing license from DataProvenance
-                    if row["License Use (DataProvenance)"] == 'unspecified' and row["License Use (GitHub)"] != ''  # check if the existing license is unspecified and a possible GitHub license is not empty ''
-                    else row["License Use (DataProvenance)"],  # if an alternative GitHub license is available (i.e. GitHub is not empty) use the GitHub license
-                    axis=1
-                )
-                # check that all DataProvenance license which are undefined are replaced with the DataProvenance IgnoreOpenAI license information
-                assert len([(dpi, git) for dpi, git in zip(df["License Use (DataProvenance)"], df["License Use (GitHub)"]) if dpi == "unspecified" and git != ""]) == 0, "Remaining DataProvenance license which are undefined"
-
-            # Check if "DataProvenance IgnoreOpenAI" is included in the selected license sources
-            # If so, apply the GitHub license information (if it is not empty) to the DataProvenance IgnoreOpenAI license information
-            if "DataProvenance IgnoreOpenAI" in selected_license_sources:
-                filtered_df["License Use (DataProvenance IgnoreOpenAI)"] = filtered_df.apply(
-                    lambda row: row["License Use (GitHub)"]  # check the existing license from DataProvenance IgnoreOpenAI
-                    if row["License Use (DataProvenance IgnoreOpenAI)"] == 'unspecified' and row["License Use (GitHub)"] != ''  # check if the existing license is unspecified and a possible GitHub license is not empty ''
-                    else row["License Use (DataProvenance IgnoreOpenAI)"],  # if an alternative GitHub license is available (i.e. GitHub is not empty) use the GitHub license
-                    axis=1
+    def cache_key(self) -> str:
+        """Canonical hash of the spec, stable across processes."""
+        payload = json.dumps(dataclasses.asdict(self), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# Whole-spec results, and the full-catalog mask of each individual predicate.
+FILTER_CACHE = cache_util.VersionedLRUCache()
+MASK_CACHE = cache_util.VersionedLRUCache(maxsize=1024)
+
+
+def filter_catalog(catalog, all_constants, spec, cache=FILTER_CACHE, mask_cache=MASK_CACHE) -> np.ndarray:
+    """Returns the (read-only) positions of the catalog rows selected by `spec`, cached per catalog version."""
+    rows = cache.get(catalog["version"], spec.cache_key()) if cache is not None else None
+    if rows is None:
+        rows = np.flatnonzero(compute_filter_mask(catalog, all_constants, spec, mask_cache))
+        rows.setflags(write=False)
+        if cache is not None:
+            cache.put(catalog["version"], spec.cache_key(), rows)
+    return rows
+
+
+#############################################################################
+############### Predicate Masks
+#############################################################################
+
+# Each predicate is evaluated against the full catalog into a boolean mask, keyed by only
+# its own parameters, so changing one form widget recomputes just that predicate.
+
+def _known_licenses_mask(catalog, all_constants):
+    license_strs = all_constants.get("LICENSE_NAMES") or frozenset(all_constants["LICENSE_CLASSES"])
+    return np.array([license_strs >= set([x["License"] for x in xs]) for xs in catalog["data"]["Licenses"]], dtype=bool)
+
+
+def _license_use_mask(catalog, license_sources, license_use, github_fallback):
+    # Any selected source with a license use at most as restrictive as the selected one.
+    # Missing licenses never match.
+    max_license_use_code = constants.LICENSE_USE_TYPES.index(license_use)
+    mask = np.zeros(len(catalog["data"]), dtype=bool)
+    for source in license_sources:
+        license_use_codes = catalog["data"][license_use_column(source, github_fallback)].to_numpy()
+        mask |= (license_use_codes != MISSING_LICENSE_CODE) & (license_use_codes <= max_license_use_code)
+    return mask
+
+
+def _license_requirement_mask(catalog, field, source, max_value):
+    # Missing licenses are coded -1, so they never exclude a dataset.
+    return catalog["data"][f"License {field} ({source})"].to_numpy() <= max_value
+
+
+def _facet_subset_mask(catalog, all_constants, column, taxonomy, groups):
+    facet = catalog["facets"][column]
+    if taxonomy:
+        allowed = index_util.encode_groups(facet, index_util.get_taxonomy(all_constants, taxonomy), groups)
+    else:
+        allowed = index_util.encode_values(facet, groups)
+    return index_util.subset_mask(facet, allowed)
+
+
+def _date_mask(catalog, start_time, end_time):
+    date_index = catalog["dates"]
+    if date_index is None:
+        df = catalog["data"]
+        if "Estimated Creation Date" in df.columns:
+            date_index = index_util.build_date_index(df["Estimated Creation Date"])
+        else:
+            date_index = index_util.build_date_index(estimate_creation_dates(df))
+    # Datasets without an Estimated Creation Date are excluded once either bound is set.
+    return index_util.date_range_mask(date_index, start_time, end_time)
+
+
+def predicate_masks(catalog, all_constants, spec):
+    """Returns (cache key, compute mask) pairs for each predicate `spec` activates."""
+    df = catalog["data"]
+    predicates = []
+    license_cube = catalog.get("license_cube")
+    cube_key = license_cube_key(spec)
+    if license_cube is not None and cube_key in license_cube["bitmaps"]:
+        # The whole license stage is one precomputed bitmap.
+        predicates.append((("license_cube", cube_key), lambda: license_cube_mask(license_cube, cube_key)))
+        spec = dataclasses.replace(
+            spec, license_sources=(), license_use=None, license_attribution=None, license_sharealike=None)
+    if spec.collection:
+        predicates.append((("collection", spec.collection), lambda: (df["Collection"] == spec.collection).to_numpy()))
+    if spec.known_licenses_only:
+        predicates.append((("known_licenses",), lambda: _known_licenses_mask(catalog, all_constants)))
+    if spec.license_use:
+        predicates.append((
+            ("license_use", spec.license_sources, spec.license_use, spec.github_fallback),
+            lambda: _license_use_mask(catalog, spec.license_sources, spec.license_use, spec.github_fallback)))
+    for field, max_value in [("Attribution", spec.license_attribution), ("Share Alike", spec.license_sharealike)]:
+        if max_value is not None:
+            for source in spec.license_sources:
+                predicates.append((
+                    ("license_requirement", field, source, max_value),
+                    lambda field=field, source=source, max_value=max_value: _license_requirement_mask(catalog, field, source, max_value)))
+    for column, taxonomy, groups in [
+        ("Languages", "LANGUAGE_GROUPS", spec.languages),
+        ("Task Categories", "TASK_GROUPS", spec.task_categories),
+        ("Text Sources", "DOMAIN_GROUPS", spec.domains),
+        ("Text Sources", None, spec.text_sources),
+    ]:
+        if groups:
+            predicates.append((
+                ("facet_subset", column, taxonomy, groups),
+                lambda column=column, taxonomy=taxonomy, groups=groups: _facet_subset_mask(catalog, all_constants, column, taxonomy, groups)))
+    if spec.no_synthetic_data:
+        predicates.append((("no_synthetic",), lambda: index_util.empty_mask(catalog["facets"]["Model Generated"])))
+    if spec.start_time or spec.end_time:
+        predicates.append((("date_range", spec.start_time, spec.end_time), lambda: _date_mask(catalog, spec.start_time, spec.end_time)))
+    return predicates
+
+
+def _cached_mask(cache, version, key, compute):
+    mask = cache.get(version, key) if cache is not None else None
+    if mask is None:
+        mask = compute()
+        mask.setflags(write=False)
+        if cache is not None:
+            cache.put(version, key, mask)
+    return mask
+
+
+def compute_filter_mask(catalog, all_constants, spec, cache=MASK_CACHE) -> np.ndarray:
+    """Boolean mask of the catalog rows selected by `spec`: the AND of its (cached) predicate masks."""
+    mask = np.ones(len(catalog["data"]), dtype=bool)
+    for key, compute in predicate_masks(catalog, all_constants, spec):
+        mask &= _cached_mask(cache, catalog["version"], key, compute)
+    return mask
+
+
+#############################################################################
+############### License Cube
+#############################################################################
+
+# The license part of the form has a small, fixed input space, so the license stage's row
+# mask is precomputed for every combination and shipped with the catalog snapshot.
+LICENSE_FORM_SOURCES = ["DataProvenance", "HuggingFace", "GitHub"]
+
+
+def license_cube_key(spec):
+    return (spec.license_sources, spec.license_use, spec.license_attribution, spec.license_sharealike, spec.github_fallback)
+
+
+def enumerate_license_specs():
+    """Yields a license-only FilterSpec for every combination the selection form can submit."""
+    for num_sources in range(len(LICENSE_FORM_SOURCES) + 1):
+        for sources in itertools.combinations(LICENSE_FORM_SOURCES, num_sources):
+            for license_use, attribution, sharealike, openai_override, github_fallback in itertools.product(
+                constants.LICENSE_USE_CLASSES, [0, 1], [0, 1], [False, True], [False, True],
+            ):
+                yield FilterSpec.from_selections(
+                    selected_license_sources=list(sources),
+                    selected_license_use=license_use,
+                    openai_license_override=openai_override,
+                    selected_license_attribution=attribution,
+                    selected_license_sharealike=sharealike,
+                    dpi_undefined_license_override=github_fallback,
                 )
-                # check that all DataProvenance IgnoreOpenAI license which are undefined are replaced with the DataProvenance IgnoreOpenAI license information
-                assert len([(dpi, git) for dpi, git in zip(df["License Use (DataProvenance IgnoreOpenAI)"], df["License Use (GitHub)"]) if dpi == "unspecified" and git != ""]) == 0, "Remaining DataProvenance IgnoreOpenAI license which are undefined"
-
-        # for all license sources ["DataProvenance", "DataProvenance IgnoreOpenAI", "HuggingFace", "GitHub"] add the license use types to the filtered_df depending on valid_license_uses ["academic-only", ...]
-        filtered_df = filtered_df[
-            filtered_df.apply(
-                lambda row: any(  # if any of the License Use of HuggingFace | GitHub  | ...  is in valid_license_uses ["academic-only",...]
-                    row[f"License Use ({key})"] in valid_license_uses  # ["academic-only", ...]
-                    for key in selected_license_sources  # ["DataProvenance", "DataProvenance IgnoreOpenAI", "HuggingFace", "GitHub"]
-                ), axis=1
-            )
-        ]
-
-        # Check if the filtered_df is smaller than the original df for those licenses which are not present in the selected_license_sources
-        # i.e we expect that the filtered_df is smaller than the original df for those licenses which are not present
-        for key in ["DataProvenance", "DataProvenance IgnoreOpenAI", "HuggingFace", "GitHub"]:
-            if key not in selected_license_sources:
-                assert len(df[f"License Use ({key})"]) >= len(filtered_df[f"License Use ({key})"]), f"Lengths don't match: {len(df[f'License Use ({key})'])} != {len(filtered_df[f'License Use ({key})'])}"
-
-    # apply license attribution filter if selected and the license is present in selected_license_sources
-    if not filtered_df.empty and selected_license_attribution:
-        filtered_df = filtered_df[
-            filtered_df.apply(
-                lambda row: all(
-                    row[f"License Attribution ({key})"] <= int(selected_license_attribution)
-                    for key in selected_license_sources
-                    if isinstance(row[f"License Attribution ({key})"], int)
-                ), axis=1
-            )
-        ]
-
-    # apply license sharealike filter if selected and the license is present in selected_license_sources
-    if not filtered_df.empty and selected_license_sharealike:
-        filtered_df = filtered_df[
-            filtered_df.apply(
-                lambda row: all(
-                    row[f"License Share Alike ({key})"] <= int(selected_license_sharealike)
-                    for key in selected_license_sources
-                    if isinstance(row[f"License Share Alike ({key})"], int)
-                ), axis=1
-            )
-        ]
-
-    if not filtered_df.empty and "All" not in selected_languages:
-        lang_strs = set(
-            [
-                lang_str
-                for k in selected_languages
-                for lang_str in all_constants["LANGUAGE_GROUPS"].get(k, [])
-            ]
-        )
-        filtered_df = filtered_df[
-            filtered_df["Languages"].apply(lambda x: lang_strs >= set(x))
-        ]
-
-    if not filtered_df.empty and "All" not in selected_task_categories:
-        taskcat_strs = set(
-            [
-                taskcat_str
-                for k in selected_task_categories
-                for taskcat_str in all_constants["TASK_GROUPS"].get(k, [])
-            ]
-        )
-        filtered_df = filtered_df[
-            filtered_df["Task Categories"].apply(lambda x: taskcat_strs >= set(x))
-        ]
-    if not filtered_df.empty and "All" not in selected_domains:
-        text_source_strs = set(
-            [
-                source_str
-                for k in selected_domains
-                for source_str in all_constants["DOMAIN_GROUPS"].get(k, [])
-            ]
-        )
-        filtered_df = filtered_df[
-            filtered_df["Text Sources"].apply(lambda x: text_source_strs >= set(x))
-        ]
-
-    if not filtered_df.empty and no_synthetic_data:
-        filtered_df = filtered_df[
-            filtered_df["Model Generated"].apply(lambda x: len(x) == 0)
-        ]
-
-    if not filtered_df.empty and text_source_allow_list:
-        filtered_df = filtered_df[
-            filtered_df["Text Sources"].apply(lambda x: len(x) == 0 or set(x) <= set(text_source_allow_list))
-        ]
-
-    if not filtered_df.empty and (selected_start_time or selected_end_time):
-
-        def get_min_date(metadata):
-            date_columns = ["S2 Date", "HF Date", "GitHub Date"]
-            dates = [metadata.get(col, "") for col in date_columns]
-            valid_dates = [pd.to_datetime(date, format='%Y-%m-%d', errors='coerce') for date in dates if date]
-            if valid_dates:
-                return min(valid_dates)
-            return pd.NaT
-
-        filtered_df['Estimated Creation Date'] = filtered_df['Inferred Metadata'].apply(get_min_date)
-        if selected_start_time:
-            filtered_df = filtered_df[filtered_df['Estimated Creation Date'] >= pd.to_datetime(selected_start_time)]
-        if selected_end_time:
-            filtered_df = filtered_df[filtered_df['Estimated Creation Date'] <= pd.to_datetime(selected_end_time)]
-
-    return filtered_df
+
+
+def build_license_cube(catalog, all_constants):
+    """Packs the license stage's row mask for every license form combination into a bitmap."""
+    bitmaps = {}
+    # The combinations share most of their predicates, so each predicate mask is computed once.
+    predicate_cache = cache_util.VersionedLRUCache(maxsize=4096)
+    for spec in enumerate_license_specs():
+        cube_key = license_cube_key(spec)
+        if cube_key not in bitmaps:
+            bitmaps[cube_key] = np.packbits(compute_filter_mask(catalog, all_constants, spec, cache=predicate_cache))
+    return {"num_rows": len(catalog["data"]), "bitmaps": bitmaps}
+
+
+def license_cube_mask(license_cube, cube_key) -> np.ndarray:
+    return np.unpackbits(license_cube["bitmaps"][cube_key], count=license_cube["num_rows"]).astype(bool)
@@ -5,12 +5,23 @@ import shlex
 import subprocess
 import json
 import jsonlines
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from src import constants
 from ast import literal_eval
 import pandas as pd
 import typing
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON decoding when installed.
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
 
 #############################################################################
 ############### Local File IO
@@ -88,13 +99,62 @@ def read_jsonl(inpath: str) -> typing.List[typing.Dict]:
 #############################################################################
 
 
-def read_data_summary_json(summary_dir: str):
+def loads_json(raw: typing.Union[bytes, str]):
+    """Decodes JSON with orjson if it is installed, falling back to the standard library."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def read_collection_json(collection_fp: str):
+    """Reads one collection file. Returns its dataset summaries, byte count and parse time."""
+    start = time.perf_counter()
+    with open(collection_fp, "rb") as inf:
+        raw = inf.read()
+    summaries = list(loads_json(raw).values())
+    return summaries, len(raw), time.perf_counter() - start
+
+
+def list_collection_files(summary_dir: str) -> typing.List[str]:
+    """Returns the collection files in a summary directory, sorted so ingest order is deterministic."""
+    return sorted(
+        fp for fp in listdir_nohidden(summary_dir)
+        if not ("_template.json" in fp or "_template_spec.yaml" in fp)
+    )
+
+
+def read_data_summary_json(
+    summary_dir: str, num_workers: int = 1, use_processes: bool = False, return_files: bool = False,
+):
+    """Reads every collection file in `summary_dir` into one list of dataset summaries.
+
+    With `num_workers > 1` the files are parsed concurrently, on a process pool if
+    `use_processes` (so large files are decoded in parallel) or otherwise a thread pool.
+    Results are always merged in sorted file order. With `return_files`, also returns
+    the collection file each summary was read from.
+    """
+    collection_fps = list_collection_files(summary_dir)
+    if num_workers > 1 and len(collection_fps) > 1:
+        pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with pool_cls(max_workers=min(num_workers, len(collection_fps))) as pool:
+            results = list(pool.map(read_collection_json, collection_fps))
+    else:
+        results = [read_collection_json(fp) for fp in collection_fps]
+
     collection_summaries = []
-    for collection_fp in listdir_nohidden(summary_dir):
-        if "_template.json" in collection_fp or "_template_spec.yaml" in collection_fp:
-            continue
-        print(collection_fp)
-        collection_summaries.extend(list(read_json(collection_fp).values()))
+    summary_fps = []
+    total_bytes = 0
+    for collection_fp, (summaries, num_bytes, seconds) in zip(collection_fps, results):
+        logger.debug(f"Read {collection_fp}: {len(summaries)} datasets, {num_bytes} bytes in {seconds * 1000:.1f} ms")
+        collection_summaries.extend(summaries)
+        summary_fps.extend([collection_fp] * len(summaries))
+        total_bytes += num_bytes
+    logger.info(
+        f"Read {len(collection_summaries)} datasets from {len(collection_fps)} collection files "
+        f"({total_bytes} bytes, decoder={'orjson' if orjson is not None else 'json'})"
+    )
+    if return_files:
+        return collection_summaries, summary_fps
     return collection_summaries
     # return pd.DataFrame(collection_summaries).fillna("")
 
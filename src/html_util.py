@@ -1,4 +1,8 @@
 import json
+import logging
+import os
+import re
+import typing
 import numpy as np
 import pandas as pd
 
@@ -6,38 +10,364 @@ import streamlit as st
 from st_aggrid import GridOptionsBuilder, AgGrid, GridUpdateMode, DataReturnMode, JsCode
 import streamlit.components.v1 as components
 
-def compose_html_component(data_summary, target_file, vars_to_files, height = None):
-    #two options to control height: either set height argument in function declaration or set const vh below and un-comment vh use in sunburst diagram
-    h = height if height != None else 600
-    html_dir = "html"
+from src import cache_util
+from src import filter_util
 
-    sketch = '<div id="container"></div>'
-    sketch += '<script type="module" src="https://d3js.org/d3.v5.min.js"></script>'
-    sketch += '<script type="module" src="https://cdn.jsdelivr.net/npm/d3@7/+esm"></script>'
-    # sketch += '<script type="module" src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.6.0/p5.js"></script>'
-    # sketch += '<script type="module" src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.6.0/addons/p5.sound.min.js"></script>'
-    # sketch += '<script type="module" src="https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm"></script>'
-    sketch += '<script type="module" src="https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6.11/+esm"></script>'
-    
+
+logger = logging.getLogger(__name__)
+
+
+# Each row-based component declares the dataset fields it reads in a `componentFields` line.
+# The sunbursts, source tree and language map are sent aggregates instead (see aggregate_util).
+_FIELDS_DECLARATION = re.compile(r"^const componentFields = (\[.*\]);?$", re.MULTILINE)
+
+# Encoded payloads, keyed by (filter result, fields) within a catalog version. Components
+# that read the same fields share one encoding.
+PAYLOAD_CACHE = cache_util.VersionedLRUCache(maxsize=64)
+
+
+def component_fields(target_file) -> typing.List[typing.Tuple[str, ...]]:
+    """The fields `target_file` declares in its `componentFields`, as paths into a row.
+
+    Components dedupe datasets by name, so payloads also carry "Dataset Name" (see encode_payload).
+    """
+    match = _FIELDS_DECLARATION.search(read_asset(f"{HTML_DIR}/{target_file}"))
+    if match is None:
+        raise ValueError(f"{HTML_DIR}/{target_file} does not declare its componentFields.")
+    return [tuple(path) for path in json.loads(match.group(1))]
+
+
+def _field_values(df, path):
+    if len(path) == 1:
+        return df[path[0]].tolist()
+    return [value.get(path[1]) if isinstance(value, dict) else None for value in df[path[0]]]
+
+
+def encode_payload(df, fields) -> str:
+    """Serializes `fields` of each row of `df` as compact, column-oriented JSON.
+
+    The result is {"length": n, "columns": [[path, values], ...]}, rebuilt into rows by
+    rowsFromColumns in helpers.js. License code columns are sent as their display values.
+    """
+    paths = [("Dataset Name",)] + [path for path in fields if path != ("Dataset Name",)]
+    projected = filter_util.decode_license_columns(df[list(dict.fromkeys(path[0] for path in paths))])
+    payload = {
+        "length": len(projected),
+        "columns": [[list(path), _field_values(projected, path)] for path in paths],
+    }
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def component_payload(df, target_file, cache_key=None) -> str:
+    """The encoded component_fields of `target_file` for the rows of `df`.
+
+    `cache_key` is (catalog version, filter spec key) identifying `df`; when given, the encoding
+    is reused by the other components reading the same fields, and on later reruns.
+    """
+    return fields_payload(df, component_fields(target_file), cache_key)
+
+
+def fields_payload(df, fields, cache_key=None) -> str:
+    """The encoded `fields` of the rows of `df`, cached as in component_payload."""
+    fields = tuple(fields)
+    if cache_key is None:
+        return encode_payload(df, fields)
+    version, result_key = cache_key
+    payload = PAYLOAD_CACHE.get(version, (result_key, fields))
+    if payload is None:
+        payload = encode_payload(df, fields)
+        PAYLOAD_CACHE.put(version, (result_key, fields), payload)
+    return payload
+
+
+#############################################################################
+############### Static Assets
+#############################################################################
+
+HTML_DIR = "html"
+
+# The libraries every component loads, in order.
+COMPONENT_SCRIPTS = [
+    '<script type="module" src="https://d3js.org/d3.v5.min.js"></script>',
+    '<script type="module" src="https://cdn.jsdelivr.net/npm/d3@7/+esm"></script>',
+    # '<script type="module" src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.6.0/p5.js"></script>',
+    # '<script type="module" src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.6.0/addons/p5.sound.min.js"></script>',
+    # '<script type="module" src="https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6/+esm"></script>',
+    '<script type="module" src="https://cdn.jsdelivr.net/npm/@observablehq/plot@0.6.11/+esm"></script>',
     # For worldmap
-    sketch += '<script src="https://unpkg.com/topojson@3"></script>'
-    sketch += '<script src="https://unpkg.com/topojson-client@3"></script>'
-    # For style
-    sketch += '<style>' + open(f"{html_dir}/style.css", 'r', encoding='utf-8').read() + '</style>'
+    '<script src="https://unpkg.com/topojson@3"></script>',
+    '<script src="https://unpkg.com/topojson-client@3"></script>',
+]
 
+# Minified asset text by path, with the mtime it was read at.
+_ASSETS = {}
+# The static HTML around each component's dataSummary, with the mtimes of the assets it was built from.
+_COMPONENT_ASSETS = {}
+# The size of each component's HTML when it was last rendered, by target file.
+COMPONENT_BYTES = {}
 
-    sketch += '<script>'
-    sketch += "const dataSummary = " + json.dumps(data_summary) + "\n"
-    # sketch += "const dataSummary = " + open(f"{html_dir}/data_summary.json", 'r', encoding='utf-8').read() + "\n"
+
+def _advance_template_stack(line: str, stack: typing.List[str]) -> None:
+    # Advances `stack` (the open template literals, "`", and ${...} braces, "{") past one line of JS.
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if stack and stack[-1] == "`":
+            if char == "\\":
+                i += 1
+            elif char == "`":
+                stack.pop()
+            elif line.startswith("${", i):
+                stack.append("{")
+                i += 1
+        elif char in "'\"":
+            i += 1
+            while i < len(line) and line[i] != char:
+                i += 2 if line[i] == "\\" else 1
+        elif char == "`":
+            stack.append("`")
+        elif line.startswith("//", i):
+            return
+        elif char == "{" and stack:
+            stack.append("{")
+        elif char == "}" and stack:
+            stack.pop()
+        i += 1
+
+
+def minify_js(text: str) -> str:
+    """Drops blank and comment-only lines and indentation, leaving template literal text intact."""
+    lines = []
+    stack = []
+    for line in text.splitlines():
+        if not (stack and stack[-1] == "`"):
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+        lines.append(line)
+        _advance_template_stack(line, stack)
+    return "\n".join(lines)
+
+
+def minify_css(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def minify_json(text: str) -> str:
+    return json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+
+
+MINIFIERS = {".js": minify_js, ".css": minify_css, ".json": minify_json}
+
+
+def read_asset(fp: str) -> str:
+    """The minified text of a static asset, read once and again only when its mtime changes."""
+    mtime = os.stat(fp).st_mtime_ns
+    cached = _ASSETS.get(fp)
+    if cached is None or cached[0] != mtime:
+        with open(fp, "r", encoding="utf-8") as inf:
+            text = inf.read()
+        minify = MINIFIERS.get(os.path.splitext(fp)[1])
+        cached = _ASSETS[fp] = (mtime, minify(text) if minify else text)
+    return cached[1]
+
+
+def component_assets(target_file, vars_to_files, height):
+    """The static HTML before and after a component's dataSummary, concatenated once per asset version.
+
+    Returns {"head": the libraries and style, "tail": the asset variables, helpers and component
+    script, "bytes": their UTF-8 size}.
+    """
+    fps = [*vars_to_files.values(), f"{HTML_DIR}/{target_file}"]
+    key = (target_file, tuple(vars_to_files.items()), height)
+    return _cached_assets(key, fps, lambda: _build_component_assets(target_file, vars_to_files, height))
+
+
+def _cached_assets(key, fps, build):
+    # The assets `build` returns, rebuilt when any of `fps` (or the shared style and helpers) changes.
+    fps = [f"{HTML_DIR}/style.css", f"{HTML_DIR}/helpers.js", *fps]
+    mtimes = tuple(os.stat(fp).st_mtime_ns for fp in fps)
+    cached = _COMPONENT_ASSETS.get(key)
+    if cached is None or cached[0] != mtimes:
+        head, tail = build()
+        assets = {"head": head, "tail": tail, "bytes": len(head.encode("utf-8")) + len(tail.encode("utf-8"))}
+        cached = _COMPONENT_ASSETS[key] = (mtimes, assets)
+    return cached[1]
+
+
+def _component_head() -> str:
+    head = '<div id="container"></div>' + "".join(COMPONENT_SCRIPTS)
+    head += '<style>' + read_asset(f"{HTML_DIR}/style.css") + '</style>'
+    head += '<script>'
+    return head
+
+
+def _build_component_assets(target_file, vars_to_files, height):
+    tail = ""
     if vars_to_files:
         for varname, fpath in vars_to_files.items():
-            sketch += f"const {varname} = " + open(fpath, 'r', encoding='utf-8').read() + "\n"
-        sketch += f"const vh = {h} " + "\n" # set height of viewport
+            tail += f"const {varname} = " + read_asset(fpath) + "\n"
+        tail += f"const vh = {height} " + "\n" # set height of viewport
+    tail += read_asset(f"{HTML_DIR}/helpers.js") + "\n"
+    tail += read_asset(f"{HTML_DIR}/{target_file}")
+    tail += '</script>'
+    return _component_head(), tail
 
-    sketch += open(f"{html_dir}/helpers.js", 'r', encoding='utf-8').read() + "\n"
-    sketch += open(f"{html_dir}/{target_file}", 'r', encoding='utf-8').read()
-    sketch += '</script>'
-    components.html(sketch, height=h)
+
+def component_byte_report() -> pd.DataFrame:
+    """Bytes of HTML each component sent on its last render, split into static assets and data, largest first."""
+    report = [{"Component": target_file, **sizes} for target_file, sizes in COMPONENT_BYTES.items()]
+    if not report:
+        return pd.DataFrame(columns=["Component", "Asset Bytes", "Data Bytes", "Total Bytes"])
+    return pd.DataFrame(report).sort_values("Total Bytes", ascending=False, ignore_index=True)
+
+
+def compose_html_component(data_summary, target_file, vars_to_files, height = None, cache_key = None):
+    """Renders an html/ component with `data_summary` as its `dataSummary`.
+
+    `data_summary` is either a (filtered) catalog frame, sent as the component's projected
+    payload (see component_payload), or a dict (e.g. a chart aggregate) sent whole. The
+    static assets come from the registry (see component_assets).
+    """
+    #two options to control height: either set height argument in function declaration or set const vh below and un-comment vh use in sunburst diagram
+    h = height if height != None else 600
+    assets = component_assets(target_file, vars_to_files, h)
+
+    if isinstance(data_summary, pd.DataFrame):
+        data = "const dataSummary = rowsFromColumns(" + component_payload(data_summary, target_file, cache_key) + ")\n"
+    else:
+        data = "const dataSummary = " + json.dumps(data_summary) + "\n"
+
+    _record_bytes(target_file, assets, data)
+    components.html(assets["head"] + data + assets["tail"], height=h)
+
+
+def _record_bytes(name, assets, data):
+    data_bytes = len(data.encode("utf-8"))
+    COMPONENT_BYTES[name] = {
+        "Asset Bytes": assets["bytes"], "Data Bytes": data_bytes, "Total Bytes": assets["bytes"] + data_bytes,
+    }
+    logger.debug("%s: %d asset bytes, %d data bytes", name, assets["bytes"], data_bytes)
+
+
+#############################################################################
+############### Dashboards
+#############################################################################
+
+# Room for each dashboard panel's title, and for each of its paragraphs, in pixels.
+DASHBOARD_TITLE_HEIGHT = 60
+DASHBOARD_PARAGRAPH_HEIGHT = 50
+
+
+def _panel_height(panel) -> int:
+    return panel.get("height") or 600
+
+
+def _is_row_panel(panel) -> bool:
+    return isinstance(panel["data_summary"], pd.DataFrame)
+
+
+def _shared_rows(panels):
+    # The one frame the row-based panels share (their payload, and its cache_key, describe it), or None.
+    frames = [panel["data_summary"] for panel in panels if _is_row_panel(panel)]
+    if any(frame is not frames[0] for frame in frames[1:]):
+        raise ValueError("Row-based dashboard panels must share the same data_summary frame.")
+    return frames[0] if frames else None
+
+
+def dashboard_assets(panels):
+    """The static HTML around a dashboard's payload, like component_assets for a single component.
+
+    Every panel's script is wrapped as its `render(container, dataSummary)`, and the asset variables
+    of all panels are declared once.
+    """
+    vars_to_files = {}
+    for panel in panels:
+        for varname, fpath in panel.get("vars_to_files", {}).items():
+            if vars_to_files.setdefault(varname, fpath) != fpath:
+                raise ValueError(f"Dashboard panels declare {varname} from both {vars_to_files[varname]} and {fpath}.")
+    layout = tuple(
+        (panel["target_file"], panel.get("title"), tuple(panel.get("description", [])), tuple(panel.get("notes", [])),
+         _panel_height(panel), _is_row_panel(panel))
+        for panel in panels
+    )
+    fps = [*vars_to_files.values(), f"{HTML_DIR}/dashboard.js", *(f"{HTML_DIR}/{panel['target_file']}" for panel in panels)]
+    return _cached_assets(("dashboard", layout, tuple(vars_to_files.items())), fps,
+                          lambda: _build_dashboard_assets(layout, vars_to_files))
+
+
+def _build_dashboard_assets(layout, vars_to_files):
+    tail = ""
+    for varname, fpath in vars_to_files.items():
+        tail += f"const {varname} = " + read_asset(fpath) + "\n"
+    tail += read_asset(f"{HTML_DIR}/helpers.js") + "\n"
+    tail += read_asset(f"{HTML_DIR}/dashboard.js") + "\n"
+    tail += "let dashboardRows;\n"
+    tail += "renderDashboard([\n"
+    for i, (target_file, title, description, notes, height, is_rows) in enumerate(layout):
+        # Row panels share one decoded payload (and so one prepareDataSummary).
+        data = "() => dashboardRows || (dashboardRows = rowsFromColumns(dashboardPayload.rows))" if is_rows \
+            else f"() => dashboardPayload.aggregates[{i}]"
+        tail += "{"
+        tail += f"title: {json.dumps(title)}, description: {json.dumps(list(description))}, "
+        tail += f"notes: {json.dumps(list(notes))}, height: {height}, data: {data},\n"
+        tail += "render: function (container, dataSummary) {\n" + read_asset(f"{HTML_DIR}/{target_file}") + "\n}},\n"
+    tail += "]);\n"
+    tail += '</script>'
+    return _component_head(), tail
+
+
+def compose_dashboard(panels, cache_key=None):
+    """Renders several html/ components as the panels of a single component.
+
+    Each panel is a dict with the arguments of compose_html_component ("data_summary", "target_file",
+    "vars_to_files", "height"), plus an optional "title", and "description" and "notes" paragraphs
+    shown above and below its chart. The page loads the libraries and assets once, and the row-based panels share one
+    payload with the union of their component_fields, so they must all be given the same frame. Each
+    panel renders when it first scrolls into view.
+    """
+    frame = _shared_rows(panels)
+    assets = dashboard_assets(panels)
+
+    rows = "null"
+    if frame is not None:
+        fields = list(dict.fromkeys(
+            path for panel in panels if _is_row_panel(panel) for path in component_fields(panel["target_file"])))
+        rows = fields_payload(frame, fields, cache_key)
+    aggregates = ",".join("null" if _is_row_panel(panel) else json.dumps(panel["data_summary"]) for panel in panels)
+    data = 'const dashboardPayload = {"rows": ' + rows + ', "aggregates": [' + aggregates + ']}\n'
+
+    _record_bytes("dashboard: " + ", ".join(panel["target_file"] for panel in panels), assets, data)
+    height = sum(
+        _panel_height(panel) + (DASHBOARD_TITLE_HEIGHT if panel.get("title") else 0)
+        + DASHBOARD_PARAGRAPH_HEIGHT * (len(panel.get("description", [])) + len(panel.get("notes", [])))
+        for panel in panels
+    )
+    components.html(assets["head"] + data + assets["tail"], height=height, scrolling=True)
+
+
+def render_panels(panels, composite=True, cache_key=None):
+    """Renders chart panels (see compose_dashboard), as one dashboard if `composite`.
+
+    Otherwise each panel gets a subheader, its paragraphs and a component of its own. `cache_key`
+    identifies the frame shared by the row-based panels.
+    """
+    if cache_key is not None:
+        _shared_rows(panels)
+    if composite:
+        compose_dashboard(panels, cache_key)
+        return
+    for panel in panels:
+        if panel.get("title"):
+            st.subheader(panel["title"])
+        for text in panel.get("description", []):
+            st.write(text)
+        compose_html_component(
+            panel["data_summary"], panel["target_file"], panel.get("vars_to_files", {}), panel.get("height"),
+            cache_key=cache_key if _is_row_panel(panel) else None)
+        for text in panel.get("notes", []):
+            st.write(text)
 
 
 
@@ -0,0 +1,194 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+# List-valued columns indexed as bitsets, with the taxonomy whose members get the first bit positions.
+FACET_TAXONOMIES = {
+    "Languages": "LANGUAGE_GROUPS",
+    "Task Categories": "TASK_GROUPS",
+    "Text Sources": "DOMAIN_GROUPS",
+    "Model Generated": "MODEL_GROUPS",
+}
+
+
+# Constants compiled into inverse indexes once per process (see catalog_util.compile_constants).
+TAXONOMY_CONSTANTS = ["LANGUAGE_GROUPS", "TASK_GROUPS", "DOMAIN_GROUPS", "MODEL_GROUPS", "CREATOR_GROUPS", "FORMATS"]
+
+
+#############################################################################
+############### Taxonomies
+#############################################################################
+
+def _bits_mask(positions, values, num_words: int) -> np.ndarray:
+    mask = np.zeros(num_words, dtype=np.uint64)
+    for value in values:
+        bit = positions.get(value)
+        if bit is not None:
+            mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    return mask
+
+
+def build_taxonomy(groups: typing.Union[typing.Dict[str, typing.List[str]], typing.List[str]]):
+    """Compiles a taxonomy (group -> members, or a flat list of values) into its inverse indexes.
+
+    Returns a dict:
+        positions: {member: bit}, in group order. build_facet keeps these bits for the taxonomy's
+            members, so group masks apply directly to a facet built with this taxonomy.
+        group_of: {member: group}. A member listed in several groups belongs to the last one.
+        group_masks: {group: uint64 bitmask of all the members it lists}.
+    """
+    if not isinstance(groups, dict):
+        groups = {value: [value] for value in groups}
+    positions = {}
+    for members in groups.values():
+        for value in members:
+            positions.setdefault(value, len(positions))
+    num_words = max(1, (len(positions) + 63) // 64)
+    return {
+        "positions": positions,
+        "group_of": {value: group for group, members in groups.items() for value in members},
+        "group_masks": {group: _bits_mask(positions, members, num_words) for group, members in groups.items()},
+    }
+
+
+def get_taxonomy(all_constants, name: str):
+    """The compiled taxonomy for a constant, from the compiled constants if present."""
+    taxonomies = all_constants.get("TAXONOMIES")
+    if taxonomies is not None and name in taxonomies:
+        return taxonomies[name]
+    return build_taxonomy(all_constants[name])
+
+
+#############################################################################
+############### Facet Bitsets
+#############################################################################
+
+def build_facet(rows: typing.List[typing.List[str]], taxonomy=None):
+    """Assigns each distinct value a bit position and packs every row into a multi-word bitmask.
+
+    Members of `taxonomy` (compiled with build_taxonomy, e.g. DOMAIN_GROUPS) keep their taxonomy
+    positions, so its group masks apply directly to the facet; values only seen in `rows` are
+    appended after them. Returns the facet as a dict:
+        vocab / positions: the values, and {value: bit}.
+        masks: uint64 array of shape (num_rows, num_words), one bitmask per row.
+        rows / codes: the exploded (row, value bit) pairs, duplicates included, for counting.
+        group_names / group_of: the taxonomy's groups, and each value's group (-1 if none).
+    """
+    taxonomy = taxonomy or build_taxonomy({})
+    positions = dict(taxonomy["positions"])
+    for values in rows:
+        for value in values:
+            positions.setdefault(value, len(positions))
+
+    group_names = list(taxonomy["group_masks"])
+    group_idx = {group: i for i, group in enumerate(group_names)}
+    group_of = np.full(len(positions), -1, dtype=np.int32)
+    for value, group in taxonomy["group_of"].items():
+        group_of[positions[value]] = group_idx[group]
+
+    row_ids = np.fromiter((i for i, values in enumerate(rows) for _ in values), dtype=np.int32)
+    codes = np.fromiter((positions[value] for values in rows for value in values), dtype=np.int32)
+    num_words = max(1, (len(positions) + 63) // 64)
+    masks = np.zeros((len(rows), num_words), dtype=np.uint64)
+    np.bitwise_or.at(masks, (row_ids, codes // 64), np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64)))
+    return {
+        "vocab": list(positions),
+        "positions": positions,
+        "masks": masks,
+        "rows": row_ids,
+        "codes": codes,
+        "group_names": group_names,
+        "group_of": group_of,
+    }
+
+
+def _text_topics(metadata):
+    return metadata.get("Text Topics", []) if isinstance(metadata, dict) else []
+
+
+def build_facet_index(df, all_constants):
+    """Builds a facet for each list-valued column used by the filters and metrics.
+
+    Besides the FACET_TAXONOMIES columns, this includes `Format`, `Creators`, `License Names` and
+    `Text Topics` (from Inferred Metadata). Domains are read from the Text Sources facet's groups.
+    """
+    facets = {}
+    for column, taxonomy in FACET_TAXONOMIES.items():
+        facets[column] = build_facet(df[column].tolist(), get_taxonomy(all_constants, taxonomy))
+
+    facets["Format"] = build_facet(df["Format"].tolist())
+    facets["Creators"] = build_facet(df["Creators"].tolist(), get_taxonomy(all_constants, "CREATOR_GROUPS"))
+    facets["License Names"] = build_facet([[x["License"] for x in xs if x["License"]] for xs in df["Licenses"]])
+    facets["Text Topics"] = build_facet([_text_topics(metadata) for metadata in df["Inferred Metadata"]])
+    return facets
+
+
+def facet_counts(facet, selected: np.ndarray) -> typing.Dict[str, int]:
+    """Counts each value's occurrences (duplicates included) over the rows where `selected` is True."""
+    counts = np.bincount(facet["codes"][selected[facet["rows"]]], minlength=len(facet["vocab"]))
+    return {facet["vocab"][code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+
+def facet_group_counts(facet, selected: np.ndarray) -> typing.Dict[str, int]:
+    """Counts value occurrences over the selected rows, summed per taxonomy group."""
+    groups = facet["group_of"][facet["codes"][selected[facet["rows"]]]]
+    counts = np.bincount(groups[groups >= 0], minlength=len(facet["group_names"]))
+    return {facet["group_names"][g]: int(counts[g]) for g in np.flatnonzero(counts)}
+
+
+def encode_values(facet, values: typing.Iterable[str]) -> np.ndarray:
+    """Returns the bitmask of `values` in this facet. Values the facet has never seen are ignored."""
+    return _bits_mask(facet["positions"], values, facet["masks"].shape[1])
+
+
+def encode_groups(facet, taxonomy, groups: typing.Iterable[str]) -> np.ndarray:
+    """Returns the bitmask of every member of `groups`, from the taxonomy's precompiled group masks.
+
+    The facet must have been built from this taxonomy (see FACET_TAXONOMIES), so their bit positions
+    agree. Unknown groups are ignored.
+    """
+    mask = np.zeros(facet["masks"].shape[1], dtype=np.uint64)
+    for group in groups:
+        group_mask = taxonomy["group_masks"].get(group)
+        if group_mask is not None:
+            mask[:len(group_mask)] |= group_mask
+    return mask
+
+
+def subset_mask(facet, allowed: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+    """Boolean mask of rows whose values are all within `allowed` (empty rows included)."""
+    masks = facet["masks"] if rows is None else facet["masks"][rows]
+    return ((masks & ~allowed) == 0).all(axis=1)
+
+
+def empty_mask(facet, rows: np.ndarray = None) -> np.ndarray:
+    """Boolean mask of rows with no values in this facet."""
+    masks = facet["masks"] if rows is None else facet["masks"][rows]
+    return (masks == 0).all(axis=1)
+
+
+#############################################################################
+############### Date Index
+#############################################################################
+
+def build_date_index(dates: pd.Series):
+    """Sorts the rows with a known date, so date ranges can be answered with searchsorted."""
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    dated_rows = np.flatnonzero(~np.isnat(values))
+    order = dated_rows[np.argsort(values[dated_rows], kind="stable")]
+    return {"order": order, "sorted_dates": values[order], "num_rows": len(values)}
+
+
+def date_range_mask(date_index, start=None, end=None) -> np.ndarray:
+    """Boolean mask of rows dated within [start, end]. Undated rows are never included."""
+    sorted_dates = date_index["sorted_dates"]
+    lo, hi = 0, len(sorted_dates)
+    if start:
+        lo = np.searchsorted(sorted_dates, pd.Timestamp(start).to_datetime64(), side="left")
+    if end:
+        hi = np.searchsorted(sorted_dates, pd.Timestamp(end).to_datetime64(), side="right")
+    mask = np.zeros(date_index["num_rows"], dtype=bool)
+    mask[date_index["order"][lo:hi]] = True
+    return mask
@@ -1,5 +1,4 @@
 from ast import literal_eval
-from collections import Counter, defaultdict
 import matplotlib.pyplot as plt
 import json
 import os
@@ -7,83 +6,157 @@ import gzip
 import numpy as np
 import pandas as pd
 import copy
+import typing
 import altair as alt
 
 import streamlit as st
 
 from src import constants
+from src import index_util
 
 
-def compute_metrics(df, all_constants):
+def text_metric(df, field) -> pd.Series:
+    """A Text Metrics field as a numeric column, using the flattened catalog column when present."""
+    if field in df.columns:
+        return df[field]
+    return pd.to_numeric(pd.Series(
+        [metrics.get(field) if isinstance(metrics, dict) else None for metrics in df["Text Metrics"]],
+        index=df.index, dtype=object), errors="coerce").fillna(0)
+
+
+def _value_counts(values) -> dict:
+    # Like dict(Counter(values)): counts keyed in order of first appearance.
+    codes, uniques = pd.factorize(values)
+    return {value: int(count) for value, count in zip(uniques, np.bincount(codes, minlength=len(uniques)))}
+
+
+def _facet_rows(df, all_constants, facet_index, rows):
+    # The facet index to count over, the positions of `df`'s rows in it, and its number of rows.
+    if facet_index is None:
+        return index_util.build_facet_index(df, all_constants), np.arange(len(df)), len(df)
+    num_rows = len(facet_index["Languages"]["masks"])
+    if rows is None:
+        raise ValueError("`rows`, the catalog positions of the frame's rows, are required with a facet_index.")
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) != len(df) or (len(rows) and (rows.min() < 0 or rows.max() >= num_rows)):
+        raise ValueError(f"Got {len(rows)} rows for a frame of {len(df)}, over a facet index of {num_rows} rows.")
+    return facet_index, rows, num_rows
+
+
+def compute_metrics(df, all_constants, facet_index=None, rows=None):
+    """Counts the collections, datasets, languages, tasks, topics, sources, domains, formats and licenses in `df`.
+
+    Facet counts are vectorized bincounts over the facet index's exploded codes. `facet_index`
+    should be the catalog's, with `rows` the catalog positions of `df`'s rows (e.g. from
+    filter_util.filter_catalog); if not given, one is built for `df` itself.
+    """
+    facet_index, rows, num_rows = _facet_rows(df, all_constants, facet_index, rows)
+
     # Datasets with the same Dataset Name may have different languages
     # but not different tasks, topics, or licenses. Let's not double count these.
-    # Drop duplicate rows based on 'Dataset Name' column
-    df_unique = df.drop_duplicates(subset='Dataset Name')
-    source_to_domain = {v: k for k, vs in all_constants["DOMAIN_GROUPS"].items() for v in vs}
-
-    datasets_count = dict(Counter(df["Unique Dataset Identifier"]))
-    collections_count = dict(Counter(df["Collection"]))
-    dialogs_count = sum([r["Num Dialogs"] for r in df["Text Metrics"].tolist()])
-    language_counts = dict(Counter([lang for row in df["Languages"] for lang in row]))
-    taskcat_counts = dict(Counter([tc for row in df_unique["Task Categories"] for tc in row]))
-    topics_count = dict(Counter([tc for row in df["Inferred Metadata"] for tc in row.get("Text Topics", [])]))
-    sources_count = dict(Counter([tc for row in df["Text Sources"] for tc in row]))
-    domains_count = dict(Counter([source_to_domain[tc] for row in df["Text Sources"] for tc in row]))
-    num_models = sum([1 if row else 0 for row in df["Model Generated"]])
-    synthetic_pct = round(100 * num_models / len(df), 1) if num_models else 0.0
-    format_counts = dict(Counter([fmt for row in df_unique["Format"] for fmt in row]))
-    license_counts = dict(Counter([license_info["License"] for licenses in df_unique["Licenses"] for license_info in licenses if license_info["License"]]))
+    selected = np.zeros(num_rows, dtype=bool)
+    selected[rows] = True
+    selected_unique = np.zeros(num_rows, dtype=bool)
+    selected_unique[rows[~df["Dataset Name"].duplicated().to_numpy()]] = True
+
+    num_models = int((~index_util.empty_mask(facet_index["Model Generated"], rows)).sum())
 
     return {
-        "collections": collections_count,
-        "datasets": datasets_count,
-        "dialogs": dialogs_count,
-        "languages": language_counts,
-        "task_categories": taskcat_counts,
-        "topics": topics_count,
-        "sources": sources_count,
-        "domains": domains_count,
-        "synthetic_pct": synthetic_pct,
-        "licenses": license_counts,
-        "formats": format_counts,
+        "collections": _value_counts(df["Collection"]),
+        "datasets": _value_counts(df["Unique Dataset Identifier"]),
+        "dialogs": int(text_metric(df, "Num Dialogs").sum()),
+        "languages": index_util.facet_counts(facet_index["Languages"], selected),
+        "task_categories": index_util.facet_counts(facet_index["Task Categories"], selected_unique),
+        "topics": index_util.facet_counts(facet_index["Text Topics"], selected),
+        "sources": index_util.facet_counts(facet_index["Text Sources"], selected),
+        "domains": index_util.facet_group_counts(facet_index["Text Sources"], selected),
+        "synthetic_pct": round(100 * num_models / len(df), 1) if num_models else 0.0,
+        "licenses": index_util.facet_counts(facet_index["License Names"], selected_unique),
+        "formats": index_util.facet_counts(facet_index["Format"], selected_unique),
     }
 
 
-def prep_collection_table(df, original_df, metrics):
-    table = defaultdict(list)
-    for collection in metrics["collections"]:
-        table["Collection"].append(collection)
-        subset_df = df[df["Collection"] == collection]
-        original_subset_df = original_df[original_df["Collection"] == collection]
-        original_datasets = set(original_subset_df["Unique Dataset Identifier"])
-        subset_datasets = set(subset_df["Unique Dataset Identifier"])
-        subset_langs = set([lang for row in subset_df["Languages"] for lang in row])
-        subset_taskcats = set([tc for row in subset_df["Task Categories"] for tc in row])
-        subset_topics = set([tc for row in subset_df["Inferred Metadata"] for tc in row.get("Text Topics", [])])
-        subset_sources = set([tc for row in subset_df["Text Sources"] for tc in row])
-        subset_model_gen = [x[0] for x in Counter([tc for row in subset_df["Model Generated"] for tc in row]).most_common()]
-        if subset_model_gen:
-            def find_openai_index(lst):
-                # Select one with "OpenAI" in string if it exists
-                return next((i for i, s in enumerate(lst) if "OpenAI" in s), 0)
-            model_idx = find_openai_index(subset_model_gen)
-            selected_model = subset_model_gen[model_idx]
-        else:
-            selected_model = ""
-        subset_mean_inp_len = np.mean([row["Mean Inputs Length"] for row in subset_df["Text Metrics"]])
-        subset_mean_tar_len = np.mean([row["Mean Targets Length"] for row in subset_df["Text Metrics"]])
-        total_dialogs = subset_df['Text Metrics'].apply(lambda x: x.get('Num Dialogs') if isinstance(x, dict) else 0).fillna(0).sum()
-        table["# Datasets"].append(len(subset_datasets))
-        table["# Exs"].append(total_dialogs)
-        table["# Languages"].append(len(subset_langs)) 
-        table["# Tasks"].append(len(subset_taskcats))
-        table["# Topics"].append(len(subset_topics))
-        table["# Sources"].append(len(subset_sources))
-        table["Generated By"].append(selected_model)
-        table["Mean Input Chars"].append(round(subset_mean_inp_len, 1))
-        table["Mean Target Chars"].append(round(subset_mean_tar_len, 1))
-        table["% Datasets Used"].append(f"{round(100* len(subset_datasets) / len(original_datasets), 1)} %")
-    return pd.DataFrame(table)
+def _group_nunique(facet, row_groups: np.ndarray, num_groups: int) -> np.ndarray:
+    # Number of distinct facet values per group, over rows with a group (>= 0).
+    entry_groups = row_groups[facet["rows"]]
+    in_group = entry_groups >= 0
+    pairs = np.unique(entry_groups[in_group].astype(np.int64) * len(facet["vocab"]) + facet["codes"][in_group])
+    return np.bincount(pairs // len(facet["vocab"]), minlength=num_groups)
+
+
+def _group_generated_by(facet, row_groups: np.ndarray, num_groups: int) -> typing.List[str]:
+    # Per group, the most common generating model, preferring the most common one with "OpenAI"
+    # in its name. Ties go to the model seen first, as with Counter.most_common.
+    entry_groups = row_groups[facet["rows"]]
+    in_group = entry_groups >= 0
+    entries = pd.DataFrame({
+        "group": entry_groups[in_group],
+        "code": facet["codes"][in_group],
+        "position": np.flatnonzero(in_group),
+    })
+    generated_by = [""] * num_groups
+    if entries.empty:
+        return generated_by
+    model_counts = entries.groupby(["group", "code"]).agg(count=("position", "size"), first=("position", "min")).reset_index()
+    model_counts = model_counts.sort_values(["group", "count", "first"], ascending=[True, False, True])
+    model_counts["model"] = [facet["vocab"][code] for code in model_counts["code"]]
+    is_openai = model_counts["model"].str.contains("OpenAI", regex=False)
+    selected = model_counts.groupby("group")["model"].first()
+    selected.update(model_counts[is_openai].groupby("group")["model"].first())
+    for group, model in selected.items():
+        generated_by[group] = model
+    return generated_by
+
+
+def prep_collection_table(df, original_df, metrics, all_constants, facet_index=None, rows=None, collection_datasets=None):
+    """Builds the "Summary of Data Collections" table with one grouped pass over `df`.
+
+    Rows follow the order of `metrics["collections"]`. As with `compute_metrics`, `facet_index`
+    should be built over `original_df` (the catalog), with `rows` the positions of `df`'s rows in it.
+    `collection_datasets` ({collection: # datasets in original_df}, e.g. the catalog's
+    baseline) saves recounting `original_df` for "% Datasets Used".
+    """
+    facet_index, rows, num_rows = _facet_rows(df, all_constants, facet_index, rows)
+
+    collections = list(metrics["collections"])
+    group_ids = pd.Index(collections).get_indexer(df["Collection"])
+    row_groups = np.full(num_rows, -1, dtype=np.int64)
+    row_groups[rows] = group_ids
+    num_groups = len(collections)
+
+    text_metrics = pd.DataFrame({
+        "group": group_ids,
+        "Num Dialogs": text_metric(df, "Num Dialogs").to_numpy(dtype=np.int64),
+        # Aggregate in float64 so the rounded means don't pick up float32 noise.
+        "Mean Inputs Length": text_metric(df, "Mean Inputs Length").to_numpy(dtype=np.float64),
+        "Mean Targets Length": text_metric(df, "Mean Targets Length").to_numpy(dtype=np.float64),
+    })
+    grouped = text_metrics.groupby("group")
+    total_dialogs = grouped["Num Dialogs"].sum().reindex(range(num_groups), fill_value=0)
+    mean_lengths = grouped[["Mean Inputs Length", "Mean Targets Length"]].mean().reindex(range(num_groups))
+
+    subset_datasets = df.groupby("Collection", observed=True)["Unique Dataset Identifier"].nunique().reindex(collections)
+    if collection_datasets is None:
+        original_datasets = original_df.groupby("Collection", observed=True)["Unique Dataset Identifier"].nunique().reindex(collections)
+    else:
+        original_datasets = pd.Series(dict(collection_datasets)).reindex(collections)
+
+    return pd.DataFrame({
+        "Collection": collections,
+        "# Datasets": subset_datasets.tolist(),
+        "# Exs": total_dialogs.tolist(),
+        "# Languages": _group_nunique(facet_index["Languages"], row_groups, num_groups).tolist(),
+        "# Tasks": _group_nunique(facet_index["Task Categories"], row_groups, num_groups).tolist(),
+        "# Topics": _group_nunique(facet_index["Text Topics"], row_groups, num_groups).tolist(),
+        "# Sources": _group_nunique(facet_index["Text Sources"], row_groups, num_groups).tolist(),
+        "Generated By": _group_generated_by(facet_index["Model Generated"], row_groups, num_groups),
+        "Mean Input Chars": mean_lengths["Mean Inputs Length"].round(1).tolist(),
+        "Mean Target Chars": mean_lengths["Mean Targets Length"].round(1).tolist(),
+        "% Datasets Used": [
+            f"{round(100 * subset / original, 1)} %"
+            for subset, original in zip(subset_datasets, original_datasets)
+        ],
+    })
 
 
 def plot_altair_piechart(counts, title, threshold_cutoff=16):
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from src import catalog_util  # noqa: E402
+from src.helpers import io  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def all_constants():
+    # The constants and data summary paths are relative to the repository root.
+    os.chdir(REPO_DIR)
+    return catalog_util.compile_constants(io.read_all_constants())
+
+
+@pytest.fixture(scope="session")
+def catalog(all_constants):
+    return catalog_util.build_catalog(all_constants)
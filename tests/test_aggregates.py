@@ -0,0 +1,203 @@
+"""Checks the server-side chart aggregates against ports of the browser-side code they replaced."""
+import random
+
+import numpy as np
+import pytest
+
+from src import aggregate_util, constants
+from src.helpers import io
+
+from test_filters import filter_rows, random_selections
+
+
+def prepare_data_summary(df):
+    """prepareDataSummary: the first variant of each Dataset Name, with the languages of all its variants."""
+    accumulated_languages = {}
+    for name, languages in zip(df["Dataset Name"], df["Languages"]):
+        accumulated_languages.setdefault(name, []).extend(languages)
+    clean, seen = [], set()
+    for row in df.to_dict(orient="records"):
+        if row["Dataset Name"] in seen:
+            continue
+        seen.add(row["Dataset Name"])
+        clean.append({
+            "languages": accumulated_languages[row["Dataset Name"]],
+            "tasks": list(row["Task Categories"]),
+            "textSources": list(row["Text Sources"]),
+            "creators": list(row["Creators"]),
+            "modelGenerated": list(row["Model Generated"]),
+        })
+    return clean
+
+
+def convert_to_sunburst_format(clean, groups, field):
+    """convertToSunburstFormat."""
+    field_counts = {}
+    for item in clean:
+        for value in item[field]:
+            field_counts[value] = field_counts.get(value, 0) + 1
+    children = []
+    for group_name, values in groups.items():
+        group_children = [{"name": value, "value": field_counts[value]} for value in values if value in field_counts]
+        if group_children:
+            children.append({"name": group_name, "children": group_children})
+    return {"name": f"{field}_groups", "children": children}
+
+
+def reference_source_tree(clean, all_constants, top_k=aggregate_util.SOURCE_TREE_TOP_K):
+    """The source-tree.js aggregation, as the tree its treedata paths described.
+
+    Its sorts are stable, so domains tied on count keep the order in which they were first
+    reached, and sources tied on count keep their order of first appearance.
+    """
+    reversed_domain_groups = {source: domain for domain, sources in all_constants["DOMAIN_GROUPS"].items() for source in sources}
+    source_counts = {}
+    for item in clean:
+        for source in item["textSources"]:
+            source_counts[source] = source_counts.get(source, 0) + 1
+    nested = {}
+    for source, count in source_counts.items():
+        nested.setdefault(reversed_domain_groups.get(source, "undefined"), {})[source] = count
+    for domain in aggregate_util.SOURCE_TREE_EXCLUDED_DOMAINS:
+        nested.pop(domain, None)
+    nested["Models"] = {}
+    for item in clean:
+        for model in item["modelGenerated"]:
+            if model and model.strip():
+                nested["Models"][model] = nested["Models"].get(model, 0) + 1
+    # The JS threw summing an empty Models domain; the aggregate leaves it out instead.
+    if not nested["Models"]:
+        del nested["Models"]
+
+    tree = []
+    for domain, sources in sorted(nested.items(), key=lambda item: -sum(item[1].values())):
+        ranked = sorted(sources.items(), key=lambda item: -item[1])
+        children = [{"name": name, "value": count} for name, count in ranked[:top_k]]
+        if len(ranked) > top_k:
+            children.append({"name": "Other", "value": sum(count for _, count in ranked[top_k:])})
+        tree.append({"name": domain, "value": sum(sources.values()), "children": children})
+    return {"total": sum(domain["value"] for domain in tree), "domains": tree}
+
+
+def reference_language_map(clean):
+    """setupLangWorldMap and the language-map.js scoring, over prepareDataSummary's languages."""
+    lang_map = {
+        code: [name.strip() for name in names.split(";")]
+        for code, names in io.read_json(constants.LANGUAGE_CODES_FP).items()
+    }
+    country_languages = io.read_json(constants.COUNTRY_LANGUAGES_FP)
+    country_to_languages, country_to_language_single = {}, {}
+    for country in io.read_json(constants.COUNTRY_CODES_FP):
+        spoken = country_languages.get(country["code"])
+        if spoken is None:
+            continue
+        country_to_languages[country["name"]] = {}
+        country_to_language_single[country["name"]] = {}
+        for code, info in spoken.items():
+            names = lang_map.get(code)
+            if names:
+                country_to_language_single[country["name"]][names[0]] = info["percent"] / 100.0
+                for name in names:
+                    country_to_languages[country["name"]][name] = info["percent"] / 100.0
+    # Its `lang in ... > 0.1` check was always true, so every spoken language maps to its countries.
+    language_to_countries = {}
+    for country, spoken in country_to_languages.items():
+        for language in spoken:
+            language_to_countries.setdefault(language, []).append(country)
+
+    counts = {}
+    for item in clean:
+        for language in item["languages"]:
+            for country in language_to_countries.get(language, []):
+                counts[country] = counts.get(country, 0) + country_to_languages[country][language]
+    max_value = max(counts.values()) if counts else None
+    return {
+        "scores": {country: count / max_value for country, count in counts.items()},
+        "tooltips": {
+            country: [[name, share] for name, share in spoken.items() if share >= aggregate_util.LANGUAGE_TOOLTIP_MIN_SHARE]
+            for country, spoken in country_to_language_single.items()
+        },
+    }
+
+
+def assert_language_maps_equal(expected, actual):
+    assert expected["tooltips"] == actual["tooltips"]
+    assert set(expected["scores"]) == set(actual["scores"])
+    for country, score in expected["scores"].items():
+        assert actual["scores"][country] == pytest.approx(score, rel=1e-9, abs=1e-12), country
+
+
+def check_aggregates(catalog, all_constants, rows):
+    """Compares every chart aggregate over the catalog `rows`, and returns the reference source tree."""
+    clean = prepare_data_summary(catalog["data"].iloc[rows])
+    aggregate = lambda target_file: aggregate_util.chart_aggregate(catalog, all_constants, target_file, rows)
+    assert aggregate("tasks-sunburst.js") == convert_to_sunburst_format(clean, all_constants["TASK_GROUPS"], "tasks")
+    assert aggregate("creator-sunburst.js") == convert_to_sunburst_format(clean, all_constants["CREATOR_GROUPS"], "creators")
+    expected_tree = reference_source_tree(clean, all_constants)
+    assert aggregate("source-tree.js") == expected_tree
+    assert_language_maps_equal(reference_language_map(clean), aggregate("language-map.js"))
+    return expected_tree
+
+
+def tree_ties(tree):
+    # Whether domains, or the sources within a domain, are tied on count, and whether any domain has an "Other".
+    domain_values = [domain["value"] for domain in tree["domains"]]
+    source_values = [[child["value"] for child in domain["children"] if child["name"] != "Other"] for domain in tree["domains"]]
+    return {
+        "domains": len(set(domain_values)) < len(domain_values),
+        "sources": any(len(set(values)) < len(values) for values in source_values),
+        "other": any(child["name"] == "Other" for domain in tree["domains"] for child in domain["children"]),
+    }
+
+
+def test_first_per_dataset_name(catalog):
+    rng = np.random.default_rng(0)
+    rows = np.sort(rng.choice(len(catalog["data"]), size=400, replace=False))
+    selected = aggregate_util.first_per_dataset_name(catalog, rows)
+    names = catalog["data"]["Dataset Name"]
+    expected, seen = [], set()
+    for row in rows:
+        if names.iloc[row] not in seen:
+            seen.add(names.iloc[row])
+            expected.append(row)
+    assert list(np.flatnonzero(selected)) == expected
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_aggregates_match_browser_code(catalog, all_constants, seed):
+    rows = filter_rows(catalog, all_constants, random_selections(random.Random(seed), all_constants))
+    if len(rows):
+        check_aggregates(catalog, all_constants, rows)
+
+
+def test_aggregate_tie_ordering(catalog, all_constants):
+    # Small random selections, where domains and sources are often tied on count.
+    rng = np.random.default_rng(0)
+    seen = {"domains": False, "sources": False, "other": False}
+    for size in [3, 5, 8, 13, 21, 34, 55, 89] * 5:
+        rows = np.sort(rng.choice(len(catalog["data"]), size=size, replace=False))
+        for kind, tied in tree_ties(check_aggregates(catalog, all_constants, rows)).items():
+            seen[kind] = seen[kind] or tied
+    tied = tree_ties(check_aggregates(catalog, all_constants, np.arange(len(catalog["data"]))))
+    seen = {kind: seen[kind] or tied[kind] for kind in seen}
+    assert seen == {"domains": True, "sources": True, "other": True}
+
+
+def test_empty_selection(catalog, all_constants):
+    rows = np.array([], dtype=np.int64)
+    assert aggregate_util.chart_aggregate(catalog, all_constants, "tasks-sunburst.js", rows) == {
+        "name": "tasks_groups", "children": []}
+    assert aggregate_util.chart_aggregate(catalog, all_constants, "source-tree.js", rows) == {"total": 0, "domains": []}
+    language_map = aggregate_util.chart_aggregate(catalog, all_constants, "language-map.js", rows)
+    assert language_map["scores"] == {}
+    assert_language_maps_equal(reference_language_map([]), language_map)
+
+    # Languages no country speaks leave every country unscored.
+    unspoken = [
+        row for row, languages in enumerate(catalog["data"]["Languages"])
+        if languages and not any(language in aggregate_util.load_language_shares()["languages"] for language in languages)
+    ]
+    rows = np.array(unspoken[:5], dtype=np.int64)
+    assert len(rows)
+    assert aggregate_util.chart_aggregate(catalog, all_constants, "language-map.js", rows)["scores"] == {}
+    check_aggregates(catalog, all_constants, rows)
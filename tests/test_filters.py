@@ -0,0 +1,273 @@
+"""Checks the catalog filters and summaries against the row-by-row `apply_filters` semantics they replaced."""
+import random
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import constants, filter_util, util
+from src.helpers import io
+
+
+def reference_filter(df, all_constants, selected_collection, selected_licenses, selected_license_sources,
+                     selected_license_use, openai_license_override, selected_license_attribution,
+                     selected_license_sharealike, selected_languages, selected_task_categories, selected_domains,
+                     no_synthetic_data, text_source_allow_list, selected_start_time, selected_end_time,
+                     dpi_undefined_license_override):
+    """The original row-by-row filters, over a frame with decoded license columns."""
+    filtered_df = df
+    sources = list(selected_license_sources)
+
+    if selected_collection:
+        filtered_df = filtered_df[filtered_df["Collection"] == selected_collection]
+
+    if not filtered_df.empty and selected_licenses:
+        license_strs = set(all_constants["LICENSE_CLASSES"].keys())
+        filtered_df = filtered_df[
+            filtered_df["Licenses"].apply(lambda xs: license_strs >= set([x["License"] for x in xs]))
+        ]
+
+    if not filtered_df.empty and selected_license_use:
+        valid_license_use_idx = constants.LICENSE_USE_TYPES.index(selected_license_use)
+        valid_license_uses = [x.lower() for x in constants.LICENSE_USE_TYPES[:valid_license_use_idx + 1]]
+        if openai_license_override and "DataProvenance" in sources:
+            sources.remove("DataProvenance")
+            sources.append("DataProvenance IgnoreOpenAI")
+
+        def license_use(row, key):
+            use = row[f"License Use ({key})"]
+            if (dpi_undefined_license_override and key.startswith("DataProvenance")
+                    and use == "unspecified" and row["License Use (GitHub)"] != ""):
+                return row["License Use (GitHub)"]
+            return use
+
+        filtered_df = filtered_df[
+            filtered_df.apply(lambda row: any(license_use(row, key) in valid_license_uses for key in sources), axis=1)
+        ]
+
+    for column, selected in [("License Attribution", selected_license_attribution),
+                             ("License Share Alike", selected_license_sharealike)]:
+        if not filtered_df.empty and selected:
+            filtered_df = filtered_df[
+                filtered_df.apply(
+                    lambda row: all(
+                        row[f"{column} ({key})"] <= int(selected)
+                        for key in sources
+                        if isinstance(row[f"{column} ({key})"], int)
+                    ), axis=1
+                )
+            ]
+
+    for column, selected, groups in [("Languages", selected_languages, "LANGUAGE_GROUPS"),
+                                     ("Task Categories", selected_task_categories, "TASK_GROUPS"),
+                                     ("Text Sources", selected_domains, "DOMAIN_GROUPS")]:
+        if not filtered_df.empty and "All" not in selected:
+            strs = set([s for k in selected for s in all_constants[groups].get(k, [])])
+            filtered_df = filtered_df[filtered_df[column].apply(lambda x: strs >= set(x))]
+
+    if not filtered_df.empty and no_synthetic_data:
+        filtered_df = filtered_df[filtered_df["Model Generated"].apply(lambda x: len(x) == 0)]
+
+    if not filtered_df.empty and text_source_allow_list and "All" not in text_source_allow_list:
+        filtered_df = filtered_df[
+            filtered_df["Text Sources"].apply(lambda x: len(x) == 0 or set(x) <= set(text_source_allow_list))
+        ]
+
+    if not filtered_df.empty and (selected_start_time or selected_end_time):
+        def get_min_date(metadata):
+            dates = [metadata.get(col, "") for col in ["S2 Date", "HF Date", "GitHub Date"]]
+            valid_dates = [pd.to_datetime(date, format='%Y-%m-%d', errors='coerce') for date in dates if date]
+            return min(valid_dates) if valid_dates else pd.NaT
+
+        creation_dates = filtered_df["Inferred Metadata"].apply(get_min_date)
+        if selected_start_time:
+            filtered_df = filtered_df[creation_dates >= pd.to_datetime(selected_start_time)]
+            creation_dates = creation_dates[filtered_df.index]
+        if selected_end_time:
+            filtered_df = filtered_df[creation_dates <= pd.to_datetime(selected_end_time)]
+
+    return filtered_df
+
+
+def reference_metrics(df, all_constants):
+    """The original per-row counters of util.compute_metrics."""
+    df_unique = df.drop_duplicates(subset="Dataset Name")
+    source_to_domain = {v: k for k, vs in all_constants["DOMAIN_GROUPS"].items() for v in vs}
+    num_models = sum([1 if row else 0 for row in df["Model Generated"]])
+    return {
+        "collections": dict(Counter(df["Collection"])),
+        "datasets": dict(Counter(df["Unique Dataset Identifier"])),
+        "dialogs": sum([r["Num Dialogs"] for r in df["Text Metrics"].tolist()]),
+        "languages": dict(Counter([lang for row in df["Languages"] for lang in row])),
+        "task_categories": dict(Counter([tc for row in df_unique["Task Categories"] for tc in row])),
+        "topics": dict(Counter([tc for row in df["Inferred Metadata"] for tc in row.get("Text Topics", [])])),
+        "sources": dict(Counter([tc for row in df["Text Sources"] for tc in row])),
+        "domains": dict(Counter([source_to_domain[tc] for row in df["Text Sources"] for tc in row])),
+        "synthetic_pct": round(100 * num_models / len(df), 1) if num_models else 0.0,
+        "licenses": dict(Counter([
+            license_info["License"] for licenses in df_unique["Licenses"]
+            for license_info in licenses if license_info["License"]
+        ])),
+        "formats": dict(Counter([fmt for row in df_unique["Format"] for fmt in row])),
+    }
+
+
+def reference_collection_table(df, original_df, metrics):
+    """The original per-collection loop of util.prep_collection_table."""
+    table = defaultdict(list)
+    for collection in metrics["collections"]:
+        subset_df = df[df["Collection"] == collection]
+        original_datasets = set(original_df[original_df["Collection"] == collection]["Unique Dataset Identifier"])
+        subset_datasets = set(subset_df["Unique Dataset Identifier"])
+        subset_model_gen = [x[0] for x in Counter([tc for row in subset_df["Model Generated"] for tc in row]).most_common()]
+        selected_model = subset_model_gen[next((i for i, s in enumerate(subset_model_gen) if "OpenAI" in s), 0)] \
+            if subset_model_gen else ""
+        table["Collection"].append(collection)
+        table["# Datasets"].append(len(subset_datasets))
+        table["# Exs"].append(sum(row["Num Dialogs"] for row in subset_df["Text Metrics"]))
+        table["# Languages"].append(len(set([x for row in subset_df["Languages"] for x in row])))
+        table["# Tasks"].append(len(set([x for row in subset_df["Task Categories"] for x in row])))
+        table["# Topics"].append(len(set([x for row in subset_df["Inferred Metadata"] for x in row.get("Text Topics", [])])))
+        table["# Sources"].append(len(set([x for row in subset_df["Text Sources"] for x in row])))
+        table["Generated By"].append(selected_model)
+        table["Mean Input Chars"].append(round(np.mean([row["Mean Inputs Length"] for row in subset_df["Text Metrics"]]), 1))
+        table["Mean Target Chars"].append(round(np.mean([row["Mean Targets Length"] for row in subset_df["Text Metrics"]]), 1))
+        table["% Datasets Used"].append(f"{round(100 * len(subset_datasets) / len(original_datasets), 1)} %")
+    return pd.DataFrame(table)
+
+
+def random_selections(rng, all_constants):
+    languages = list(all_constants["LANGUAGE_GROUPS"])
+    tasks = list(all_constants["TASK_GROUPS"])
+    domains = list(all_constants["DOMAIN_GROUPS"])
+    text_sources = io.read_txt("src/configs/limited_text_sources.txt")
+    return dict(
+        selected_collection=rng.choice([None, None, "Flan Collection (P3)"]),
+        selected_licenses=rng.choice([None, ["All"]]),
+        selected_license_sources=rng.sample(["DataProvenance", "HuggingFace", "GitHub"], rng.randint(1, 3)),
+        selected_license_use=rng.choice(["Commercial", "Unspecified", "Non-Commercial", "Academic-Only"]),
+        openai_license_override=rng.random() < 0.5,
+        selected_license_attribution=rng.choice(["0", "1"]),
+        selected_license_sharealike=rng.choice(["0", "1"]),
+        selected_languages=rng.choice([["All"], rng.sample(languages, 3)]),
+        selected_task_categories=rng.choice([["All"], rng.sample(tasks, 8)]),
+        selected_domains=rng.choice([["All"], rng.sample(domains, 6)]),
+        no_synthetic_data=rng.random() < 0.5,
+        text_source_allow_list=rng.choice([["All"], rng.sample(text_sources, 30), []]),
+        selected_start_time=rng.choice([None, "2018-01-01", "2021-06-01"]),
+        selected_end_time=rng.choice([None, "2022-01-01", "2023-03-01"]),
+        dpi_undefined_license_override=rng.choice([0, 1]),
+    )
+
+
+NO_FILTERS = dict(
+    selected_collection=None,
+    selected_licenses=None,
+    selected_license_sources=["DataProvenance"],
+    selected_license_use=None,
+    openai_license_override=False,
+    selected_license_attribution=None,
+    selected_license_sharealike=None,
+    selected_languages=["All"],
+    selected_task_categories=["All"],
+    selected_domains=["All"],
+    no_synthetic_data=False,
+    text_source_allow_list=["All"],
+    selected_start_time=None,
+    selected_end_time=None,
+    dpi_undefined_license_override=0,
+)
+
+
+@pytest.fixture(scope="module")
+def decoded_data(catalog):
+    return filter_util.decode_license_columns(catalog["data"])
+
+
+def filter_rows(catalog, all_constants, selections):
+    spec = filter_util.FilterSpec.from_selections(**selections)
+    return filter_util.filter_catalog(catalog, all_constants, spec)
+
+
+def assert_metrics_equal(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        assert value == actual[key], key
+    # The collections keep their first-seen order, which orders the collection table.
+    assert list(expected["collections"]) == list(actual["collections"])
+
+
+def assert_tables_equal(expected, actual):
+    assert len(expected) == len(actual)
+    for column in expected.columns:
+        assert list(expected[column]) == list(actual[column]), column
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_filter_catalog_matches_row_filters(catalog, all_constants, decoded_data, seed):
+    selections = random_selections(random.Random(seed), all_constants)
+    expected = reference_filter(decoded_data, all_constants, **selections)
+    rows = filter_rows(catalog, all_constants, selections)
+    assert list(rows) == list(expected.index)
+    assert list(filter_util.apply_filters(catalog["data"], all_constants, **selections).index) == list(expected.index)
+
+    if len(rows):
+        actual = catalog["data"].iloc[rows]
+        metrics = util.compute_metrics(actual, all_constants, catalog["facets"], rows)
+        assert_metrics_equal(reference_metrics(expected, all_constants), metrics)
+        assert_tables_equal(
+            reference_collection_table(expected, decoded_data, metrics),
+            util.prep_collection_table(actual, catalog["data"], metrics, all_constants, catalog["facets"], rows),
+        )
+
+
+def test_unfiltered_summaries(catalog, all_constants, decoded_data):
+    rows = filter_rows(catalog, all_constants, NO_FILTERS)
+    assert len(rows) == len(catalog["data"])
+    metrics = util.compute_metrics(catalog["data"], all_constants, catalog["facets"], rows)
+    assert_metrics_equal(reference_metrics(decoded_data, all_constants), metrics)
+    assert_tables_equal(
+        reference_collection_table(decoded_data, decoded_data, metrics),
+        util.prep_collection_table(catalog["data"], catalog["data"], metrics, all_constants, catalog["facets"], rows),
+    )
+
+
+def test_summaries_ignore_the_frame_index(catalog, all_constants, decoded_data):
+    selections = dict(NO_FILTERS, selected_collection="Flan Collection (P3)")
+    rows = filter_rows(catalog, all_constants, selections)
+    actual = catalog["data"].iloc[rows].reset_index(drop=True)
+    expected = decoded_data.iloc[rows]
+    metrics = util.compute_metrics(actual, all_constants, catalog["facets"], rows)
+    assert_metrics_equal(reference_metrics(expected, all_constants), metrics)
+    assert_tables_equal(
+        reference_collection_table(expected, decoded_data, metrics),
+        util.prep_collection_table(actual, catalog["data"], metrics, all_constants, catalog["facets"], rows),
+    )
+    # Without the catalog's facet index, one is built for the frame itself.
+    assert_metrics_equal(reference_metrics(expected, all_constants), util.compute_metrics(actual, all_constants))
+    assert_tables_equal(
+        reference_collection_table(expected, decoded_data, metrics),
+        util.prep_collection_table(actual, catalog["data"], metrics, all_constants),
+    )
+
+    with pytest.raises(ValueError):
+        util.compute_metrics(actual, all_constants, catalog["facets"])
+    with pytest.raises(ValueError):
+        util.compute_metrics(actual, all_constants, catalog["facets"], rows[:-1])
+
+
+def test_empty_result(catalog, all_constants, decoded_data):
+    selections = dict(NO_FILTERS, selected_collection="No Such Collection")
+    assert reference_filter(decoded_data, all_constants, **selections).empty
+    rows = filter_rows(catalog, all_constants, selections)
+    assert len(rows) == 0
+
+    actual = catalog["data"].iloc[rows]
+    metrics = util.compute_metrics(actual, all_constants, catalog["facets"], rows)
+    assert metrics["synthetic_pct"] == 0.0
+    assert metrics["dialogs"] == 0
+    for key in ["collections", "datasets", "languages", "task_categories", "topics", "sources", "domains",
+                "licenses", "formats"]:
+        assert not metrics[key], key
+    assert util.prep_collection_table(actual, catalog["data"], metrics, all_constants, catalog["facets"], rows).empty